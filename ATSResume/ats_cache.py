@@ -0,0 +1,106 @@
+# Persistent cache for ATS evaluations.
+#
+# Extracted resume text is keyed by the SHA-256 of the PDF bytes; parsed
+# Gemini results are keyed by (resume hash, normalized JD hash, prompt
+# template version, model name). Entries expire after `ttl` seconds and the
+# least recently used ones are evicted past `max_entries`.
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from ats_helpers import input_prompt, input_pdf_text, MODEL_NAME
+from prescore import PROMPT_TOKEN_BUDGET
+
+CACHE_PATH = os.getenv("ATS_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ats_cache.sqlite"))
+
+# editing the prompt template or its token budget changes the version and so invalidates old results
+PROMPT_VERSION = hashlib.sha256(f"{input_prompt}|{PROMPT_TOKEN_BUDGET}".encode("utf-8")).hexdigest()[:12]
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def resume_hash(file):
+    # file path, raw bytes or an uploaded file object
+    if isinstance(file, bytes):
+        return sha256(file)
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return sha256(f.read())
+    return sha256(file.getvalue())
+
+
+def normalize_jd(jd):
+    return " ".join(jd.split()).lower()
+
+
+class ATSCache:
+    def __init__(self, path=CACHE_PATH, ttl=7 * 24 * 3600, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = {"texts": 0, "results": 0}
+        self.misses = {"texts": 0, "results": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        for table in ("texts", "results"):
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, created REAL, last_used REAL)")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_lru ON {table} (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def result_key(resume_hash, jd, model=MODEL_NAME):
+        return "|".join([resume_hash, sha256(normalize_jd(jd).encode("utf-8")), PROMPT_VERSION, model])
+
+    def _get(self, table, key):
+        with self._lock:
+            now = time.time()
+            row = self._db.execute(f"SELECT value FROM {table} WHERE key = ? AND created >= ?", (key, now - self.ttl)).fetchone()
+            if row is None:
+                self.misses[table] += 1
+                return None
+            self._db.execute(f"UPDATE {table} SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits[table] += 1
+            return row[0]
+
+    def _put(self, table, key, value):
+        with self._lock:
+            now = time.time()
+            self._db.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self._db.execute(f"DELETE FROM {table} WHERE created < ?", (now - self.ttl,))
+            self._db.execute(f"DELETE FROM {table} WHERE key IN (SELECT key FROM {table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                             (self.max_entries,))
+            self._db.commit()
+
+    def get_text(self, resume_hash):
+        return self._get("texts", resume_hash)
+
+    def put_text(self, resume_hash, text):
+        self._put("texts", resume_hash, text)
+
+    def resume_text(self, file, resume_hash):
+        # extracted text from the cache, extracting (and caching) it on a miss
+        text = self.get_text(resume_hash)
+        if text is None:
+            text = input_pdf_text(file)
+            self.put_text(resume_hash, text)
+        return text
+
+    def get_result(self, resume_hash, jd, model=MODEL_NAME):
+        value = self._get("results", self.result_key(resume_hash, jd, model))
+        return json.loads(value) if value is not None else None
+
+    def put_result(self, resume_hash, jd, result, model=MODEL_NAME):
+        self._put("results", self.result_key(resume_hash, jd, model), json.dumps(result))
+
+    def stats(self):
+        stats = {}
+        for table in ("texts", "results"):
+            total = self.hits[table] + self.misses[table]
+            stats[table] = {"hits": self.hits[table], "misses": self.misses[table],
+                            "hit_rate": self.hits[table] / total if total else 0.0}
+        return stats
@@ -0,0 +1,72 @@
+# Helpers shared by the ATS Streamlit apps and the batch ranking CLI.
+import os
+import re
+import sys
+import json
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+# shared helpers live in ../common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_extract import pdf_text
+
+load_dotenv()
+
+# Configure Google Generative AI
+genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+MODEL_NAME = "gemini-2.0-flash"
+
+input_prompt = """ 
+You are an expert ATS (Applicant Tracking System) with deep knowledge in tech fields including software engineering, data science, data analytics and machine learning.
+
+Your task is to analyze the resume against the given job description and 
+provide a deatiled analysis of how well the resume matches the job description.
+consider the competitive job market and provide a actionable improvement suggestions .
+
+IMPORTANT: You must respond with ONLY a JSON object in the following exact format, with no additional text:
+{{
+    "JD Match": "X%", 
+    "MissingKeywords": ["keyword1", "keyword2", ...],
+    "profileSummary": "your detailed analysis and improvement suggestions here"
+}}
+
+resume: {text}
+description: {jd}
+"""
+
+def get_gemini_response(prompt):
+    model = genai.GenerativeModel(MODEL_NAME)
+    response = model.generate_content(prompt)
+    return response.text
+
+async def get_gemini_response_async(prompt):
+    model = genai.GenerativeModel(MODEL_NAME)
+    response = await model.generate_content_async(prompt)
+    return response.text
+
+def clean_json_response(response):
+    json_match = re.search(r'\{.*\}', response, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(0)
+        json_str = json_str.replace('\n', ' ').replace('\r', '')
+        return json_str
+    return None
+
+def parse_result(response):
+    # parsed JSON dict, or None when the model output is not valid JSON
+    json_str = clean_json_response(response)
+    if not json_str:
+        return None
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        return None
+
+def match_score(value):
+    # "85%" -> 85.0
+    m = re.search(r"\d+(\.\d+)?", str(value))
+    return float(m.group(0)) if m else None
+
+def input_pdf_text(file):
+    return pdf_text([file])
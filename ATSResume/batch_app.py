@@ -0,0 +1,74 @@
+# Bulk resume ranking: upload many resumes, score them against one JD
+import queue
+import asyncio
+import threading
+import streamlit as st
+from batch_rank import DEFAULT_CONCURRENCY, extract_resumes, iter_rankings, report_rows, report_csv, report_json
+from ats_cache import ATSCache
+from prescore import MIN_KEYWORD_OVERLAP
+
+st.set_page_config(page_title="Gemini ATS Bulk Ranking", page_icon=":guardsman:", layout="wide")
+
+st.title("Gemini ATS Bulk Ranking")
+st.markdown("#### Rank many resumes against one job description")
+
+jd = st.text_area("Paste the Job Description here", placeholder="Paste full job description (responsibilities, skills, qualifications)...")
+uploaded_files = st.file_uploader("Upload Resumes (PDF)", type="pdf", accept_multiple_files=True)
+concurrency = st.slider("Concurrent Gemini calls", 1, 32, DEFAULT_CONCURRENCY)
+min_overlap = st.slider("Skip the LLM below this JD keyword overlap (%)", 0.0, 100.0, MIN_KEYWORD_OVERLAP)
+
+submit = st.button("Rank Resumes")
+
+@st.cache_resource
+def get_ats_cache():
+    return ATSCache()
+
+@st.cache_resource
+def get_event_loop():
+    # one loop for the whole server process: genai caches its async gRPC client,
+    # which stays bound to the loop of the first call, so a fresh asyncio.run
+    # per click would fail every call after the first ranking
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def iter_results(resumes, cache):
+    # results of iter_rankings, run on the shared loop, handed to the script thread
+    results = queue.Queue()
+
+    async def produce():
+        try:
+            async for result in iter_rankings(resumes, jd, concurrency, cache, min_overlap):
+                results.put(result)
+        finally:
+            results.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), get_event_loop())
+    while (result := results.get()) is not None:
+        yield result
+    future.result()  # re-raises anything iter_rankings raised
+
+def rank(resumes, cache):
+    results = []
+    progress = st.progress(0.0)
+    table = st.empty()
+    # the leaderboard is re-ranked every time a result arrives
+    for result in iter_results(resumes, cache):
+        results.append(result)
+        progress.progress(len(results) / len(resumes), text=f"Scored {len(results)}/{len(resumes)}")
+        table.dataframe(report_rows(results), use_container_width=True)
+    return results
+
+if submit:
+    if uploaded_files and jd:
+        with st.spinner("Extracting resume text..."):
+            cache = get_ats_cache()
+            resumes = list(extract_resumes(uploaded_files, cache))
+        results = rank(resumes, cache)
+        stats = cache.stats()["results"]
+        st.caption(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
+
+        st.download_button("Download CSV report", report_csv(results), file_name="ats_report.csv", mime="text/csv")
+        st.download_button("Download JSON report", report_json(results), file_name="ats_report.json", mime="application/json")
+    else:
+        st.error("Please upload PDF resumes and provide a job description.")
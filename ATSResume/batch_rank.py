@@ -0,0 +1,175 @@
+# Bulk resume ranking against one job description.
+#
+# Resumes are scored concurrently (bounded by an asyncio semaphore) and each
+# result is yielded as soon as its Gemini call completes, so callers can show
+# a live leaderboard. The final report is written as CSV or JSON.
+#
+# Usage:
+#   python batch_rank.py --jd job_description.txt resumes/ -o report.csv --concurrency 8
+import io
+import os
+import csv
+import json
+import asyncio
+import argparse
+import itertools
+
+from ats_helpers import get_gemini_response_async, parse_result, match_score
+# shared helpers live in ../common (put on sys.path by ats_helpers)
+from common.pdf_extract import iter_pdf_pages
+from prescore import build_prompt, prescore_many, MIN_KEYWORD_OVERLAP
+from ats_cache import ATSCache, resume_hash
+
+DEFAULT_CONCURRENCY = 8
+REPORT_FIELDS = ["rank", "resume", "jd_match", "keyword_overlap", "screened_out", "missing_keywords", "profile_summary", "error"]
+
+
+def source_name(source):
+    return os.path.basename(source) if isinstance(source, str) else source.name
+
+
+def extract_resumes(sources, cache=None):
+    # (name, text, resume hash, error) per resume; text already in the cache is
+    # not re-extracted, the rest is extracted page-parallel in one process pool.
+    # An unreadable PDF gets an error message instead of stopping the batch.
+    pending = []
+    for source in sources:
+        rhash = resume_hash(source)
+        text = cache.get_text(rhash) if cache else None
+        if text is None:
+            pending.append((source, rhash))
+        else:
+            yield source_name(source), text, rhash, None
+    texts, errors = {}, {}
+    pages = iter_pdf_pages([source for source, _ in pending], errors="record")
+    for doc, group in itertools.groupby(pages, key=lambda r: r.doc):
+        group = list(group)
+        texts[doc] = "\n".join(r.text for r in group if r.text)
+        errors[doc] = next((r.error for r in group if r.error), None)
+    for doc, (source, rhash) in enumerate(pending):
+        text, error = texts.get(doc, ""), errors.get(doc)
+        if cache and error is None:
+            cache.put_text(rhash, text)
+        yield source_name(source), text, rhash, error
+
+
+def build_result(name, pre, parsed=None, error=None):
+    result = {"resume": name, "jd_match": None, "keyword_overlap": pre["keyword_overlap"], "screened_out": False,
+              "missing_keywords": pre["missing_keywords"], "profile_summary": "", "error": error}
+    if parsed is not None:
+        result["jd_match"] = match_score(parsed.get("JD Match"))
+        result["missing_keywords"] = parsed.get("MissingKeywords") or []
+        result["profile_summary"] = parsed.get("profileSummary", "")
+    return result
+
+
+async def score_resume(name, text, rhash, jd, pre, semaphore, cache=None, min_overlap=MIN_KEYWORD_OVERLAP,
+                       error=None):
+    if error is not None:
+        # unreadable PDF: reported as an error row, never sent to the model
+        return build_result(name, pre, error=f"Could not read PDF: {error}")
+    parsed = cache.get_result(rhash, jd) if cache else None
+    if parsed is not None:
+        return build_result(name, pre, parsed)
+    if pre["keyword_overlap"] < min_overlap:
+        # clearly non-matching: ranked on the local score alone, no LLM call
+        result = build_result(name, pre)
+        result["screened_out"] = True
+        result["profile_summary"] = f"Screened out locally: {pre['keyword_overlap']:.0f}% of JD keywords found."
+        return result
+    async with semaphore:
+        try:
+            response = await get_gemini_response_async(build_prompt(text, jd))
+        except Exception as e:
+            return build_result(name, pre, error=str(e))
+    parsed = parse_result(response)
+    if parsed is None:
+        return build_result(name, pre, error="No valid JSON response found")
+    if cache:
+        cache.put_result(rhash, jd, parsed)
+    return build_result(name, pre, parsed)
+
+
+async def iter_rankings(resumes, jd, concurrency=DEFAULT_CONCURRENCY, cache=None, min_overlap=MIN_KEYWORD_OVERLAP):
+    # resumes: iterable of (name, text, resume hash, error) as from extract_resumes;
+    # results arrive in completion order
+    resumes = list(resumes)
+    pres = prescore_many([text for _, text, _, _ in resumes], jd)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(score_resume(name, text, rhash, jd, pre, semaphore, cache, min_overlap, error))
+             for (name, text, rhash, error), pre in zip(resumes, pres)]
+    for task in asyncio.as_completed(tasks):
+        yield await task
+
+
+def rank_results(results):
+    ranked = sorted(results, key=lambda r: (r["jd_match"] is None, -(r["jd_match"] or 0), -r["keyword_overlap"]))
+    return [dict(r, rank=i + 1) for i, r in enumerate(ranked)]
+
+
+def report_rows(results):
+    # ranked rows flattened for tables and CSV
+    return [dict(r, missing_keywords="; ".join(map(str, r["missing_keywords"]))) for r in rank_results(results)]
+
+
+def report_csv(results):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(report_rows(results))
+    return buf.getvalue()
+
+
+def report_json(results):
+    return json.dumps(rank_results(results), indent=2)
+
+
+def write_report(results, path):
+    report = report_json(results) if path.lower().endswith(".json") else report_csv(results)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(report)
+
+
+def collect_pdfs(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(".pdf"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+async def run(args):
+    with open(args.jd, encoding="utf-8") as f:
+        jd = f.read()
+    cache = None if args.no_cache else ATSCache()
+    resumes = list(extract_resumes(list(collect_pdfs(args.resumes)), cache))
+    results = []
+    async for result in iter_rankings(resumes, jd, args.concurrency, cache, args.min_overlap):
+        results.append(result)
+        if result["screened_out"]:
+            score = f"screened out ({result['keyword_overlap']:.0f}% keywords)"
+        else:
+            score = "error" if result["jd_match"] is None else f"{result['jd_match']:.0f}%"
+        print(f"[{len(results)}/{len(resumes)}] {result['resume']}: {score}", flush=True)
+    write_report(results, args.output)
+    print(f"Report written to {args.output}")
+    if cache:
+        print("Cache:", json.dumps(cache.stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank many PDF resumes against one job description")
+    parser.add_argument("resumes", nargs="+", help="PDF files or directories of PDFs")
+    parser.add_argument("--jd", required=True, help="text file with the job description")
+    parser.add_argument("-o", "--output", default="ats_report.csv", help="report path (.csv or .json)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="max Gemini calls in flight")
+    parser.add_argument("--min-overlap", type=float, default=MIN_KEYWORD_OVERLAP,
+                        help="JD keyword overlap (%%) below which resumes skip the LLM; 0 scores everything")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the evaluation cache")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,9 @@
 # app.py
 import streamlit as st
-import google.generativeai as genai
-import PyPDF2 as pdf
-import os
-from dotenv import load_dotenv
 import json
-import re
-
-load_dotenv()
-
-# Configure Google Generative AI
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+from ats_helpers import get_gemini_response, clean_json_response
+from prescore import build_prompt
+from ats_cache import ATSCache, resume_hash
 
 # --- Page config ---
 st.set_page_config(page_title="Gemini ATS Resume Builder", page_icon=":guardsman:", layout="wide")
@@ -115,30 +108,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# --- Helper functions ---
-def get_gemini_response(prompt):
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
-    return response.text
-
-def clean_json_response(response):
-    json_match = re.search(r'\{.*\}', response, re.DOTALL)
-    if json_match:
-        json_str = json_match.group(0)
-        json_str = json_str.replace('\n', ' ').replace('\r', '')
-        return json_str
-    return None
-
-def input_pdf_text(file):
-    reader = pdf.PdfReader(file)
-    text = ""
-    for p in range(len(reader.pages)):
-        page = reader.pages[p]
-        txt = page.extract_text()
-        if txt:
-            text += txt + "\n"
-    return text
-
 # --- Layout ---
 with st.container():
     st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -160,35 +129,29 @@ with st.container():
     st.markdown('</div>', unsafe_allow_html=True)
 
 # --- Logic ---
-input_prompt = """ 
-You are an expert ATS (Applicant Tracking System) with deep knowledge in tech fields including software engineering, data science, data analytics and machine learning.
-
-Your task is to analyze the resume against the given job description and 
-provide a deatiled analysis of how well the resume matches the job description.
-consider the competitive job market and provide a actionable improvement suggestions .
-
-IMPORTANT: You must respond with ONLY a JSON object in the following exact format, with no additional text:
-{{
-    "JD Match": "X%", 
-    "MissingKeywords": ["keyword1", "keyword2", ...],
-    "profileSummary": "your detailed analysis and improvement suggestions here"
-}}
-
-resume: {text}
-description: {jd}
-"""
+@st.cache_resource
+def get_ats_cache():
+    return ATSCache()
 
 if submit:
     if uploaded_file is not None and jd:
-        with st.spinner("Analyzing resume — this may take a few seconds..."):
-            text = input_pdf_text(uploaded_file)
-            prompt = input_prompt.format(text=text, jd=jd)
-            response = get_gemini_response(prompt)
-            json_str = clean_json_response(response)
+        cache = get_ats_cache()
+        resume_key = resume_hash(uploaded_file)
+        cached_result = cache.get_result(resume_key, jd)
+        if cached_result is not None:
+            json_str = json.dumps(cached_result)
+        else:
+            with st.spinner("Analyzing resume — this may take a few seconds..."):
+                text = cache.resume_text(uploaded_file, resume_key)
+                prompt = build_prompt(text, jd)
+                response = get_gemini_response(prompt)
+                json_str = clean_json_response(response)
 
         if json_str:
             try:
                 result = json.loads(json_str)
+                if cached_result is None:
+                    cache.put_result(resume_key, jd, result)
                 st.markdown("<div class='card' style='margin-top:18px'>", unsafe_allow_html=True)
                 st.subheader("Analysis Results")
 
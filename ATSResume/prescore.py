@@ -0,0 +1,94 @@
+# Local lexical pre-pass for the ATS prompt.
+#
+# Deterministically scores how well a resume covers the JD keywords (keyword
+# overlap plus BM25), lists the JD keywords the resume is missing, strips
+# boilerplate / duplicate lines from the extracted text and caps the resume
+# part of the prompt to a token budget. In batch screening, resumes below
+# MIN_KEYWORD_OVERLAP are ranked locally without an LLM call.
+import re
+from collections import Counter
+
+from ats_helpers import input_prompt
+from common.lexical import BM25, content_tokens
+
+PROMPT_TOKEN_BUDGET = 3000   # resume tokens sent to the model
+MAX_JD_KEYWORDS = 40
+MIN_KEYWORD_OVERLAP = 15.0   # % of JD keywords; below this a batch resume is screened out
+
+# job-ad filler that says nothing about the required skills
+JD_FILLER = frozenset("""
+ability able candidate candidates excellent experience good great ideal join knowledge looking must need
+plus preferred required requirements responsibilities role skills strong team work working year years
+""".split())
+
+# page furniture left behind by PDF text extraction
+BOILERPLATE_RE = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+|curriculum vitae|resume|references available upon request\.?)$",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text
+    return len(text) // 4
+
+
+def clean_text(text):
+    # drop empty, boilerplate and repeated lines; collapse runs of whitespace
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        key = line.lower()
+        if not line or key in seen or BOILERPLATE_RE.match(line) or not re.search(r"\w", line):
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def jd_keywords(jd, top_n=MAX_JD_KEYWORDS):
+    # most frequent content words of the JD, ties broken by first occurrence
+    counts = Counter(t for t in content_tokens(jd) if len(t) > 1 and t not in JD_FILLER)
+    return [term for term, _ in counts.most_common(top_n)]
+
+
+def prescore(text, jd, keywords=None):
+    keywords = keywords if keywords is not None else jd_keywords(jd)
+    tokens = content_tokens(text)
+    present = set(tokens)
+    missing = [k for k in keywords if k not in present]
+    overlap = 100.0 * (len(keywords) - len(missing)) / len(keywords) if keywords else 0.0
+    return {"keyword_overlap": round(overlap, 1), "bm25": BM25([tokens]).score(keywords, 0), "missing_keywords": missing}
+
+
+def prescore_many(texts, jd):
+    # BM25 with document frequencies taken across the whole batch
+    keywords = jd_keywords(jd)
+    results = [prescore(text, jd, keywords) for text in texts]
+    bm25 = BM25([content_tokens(text) for text in texts]).scores(keywords)
+    for result, score in zip(results, bm25):
+        result["bm25"] = score
+    return results
+
+
+def compact_resume(text, jd, token_budget=PROMPT_TOKEN_BUDGET):
+    text = clean_text(text)
+    if estimate_tokens(text) <= token_budget:
+        return text
+    # keep the lines that mention the most JD keywords, in their original order
+    keywords = set(jd_keywords(jd))
+    lines = text.splitlines()
+    ranked = sorted(range(len(lines)), key=lambda i: -sum(t in keywords for t in content_tokens(lines[i])))
+    keep, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > token_budget:
+            continue
+        keep.add(i)
+        used += cost
+    return "\n".join(lines[i] for i in sorted(keep))
+
+
+def build_prompt(text, jd, token_budget=PROMPT_TOKEN_BUDGET):
+    return input_prompt.format(text=compact_resume(text, jd, token_budget), jd=clean_text(jd))
@@ -1,28 +1,65 @@
 # import required libraries
+# TensorFlow / the TFLite interpreter are imported on first model load, not here
+import io
+import os
+import time
+import logging
+_SCRIPT_START = time.perf_counter()
 import streamlit as st
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+import pandas as pd
 from PIL import Image
 import numpy as np
-from tensorflow.keras.preprocessing.image import img_to_array
-import matplotlib.pyplot as plt
-
-CLASS_NAMES= ['Audi', 'Hyundai Creta', 'Mahindra Scorpio', 'Rolls Royce', 'Swift', 'Tata Safari', 'Toyota Innova'] 
+from car_helpers import CLASS_NAMES, BACKENDS, BACKEND, load_model_timed, preprocess_image, predict_batch, predict_many
+from batch_predict import report_row
+from prediction_cache import PredictionCache
+APP_IMPORT_S = time.perf_counter() - _SCRIPT_START
+logger = logging.getLogger(__name__)
 
 @st.cache_resource
-def load_trained_model():
-    return load_model("CarModel.h5")
-
-def preprocess_image(image):
-    image = image.resize((128,128))
-    img_array = img_to_array(image) / 255.0
-    return np.expand_dims(img_array, axis=0)
+def load_trained_model(backend):
+    # "tflite" runs the quantized export (export_model.py) without TensorFlow;
+    # the model is warmed up here, once per process
+    model, timings = load_model_timed(backend)
+    timings["app_import_s"] = APP_IMPORT_S
+    logger.info("startup: %s", ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in timings.items()))
+    return model, timings
 
-def predict_car_class(model,image):
-    processed_image = preprocess_image(image)
-    predictions = model.predict(processed_image)
-    idx = np.argmax(predictions[0])
-    return CLASS_NAMES[idx], float(predictions[0][idx])*100, predictions[0], idx
+@st.cache_resource
+def get_prediction_cache():
+    # shared by all sessions; full probability vectors keyed by image hash
+    return PredictionCache()
+
+def predict_car_class(model, image, backend, data, perceptual=False):
+    cache = get_prediction_cache()
+    predictions = cache.lookup(backend, data, image if perceptual else None)
+    if predictions is None:
+        predictions = predict_batch(model, [preprocess_image(image)], batch_size=1)[0]
+        cache.store(backend, data, predictions, image)
+    idx = np.argmax(predictions)
+    return CLASS_NAMES[idx], float(predictions[idx])*100, predictions, idx
+
+def open_image(data):
+    try:
+        return Image.open(io.BytesIO(data))
+    except OSError:
+        return None
+
+def predict_many_cached(model, files, backend, perceptual=False):
+    # report rows in upload order; only cache misses go through the model
+    cache = get_prediction_cache()
+    probs, misses = {}, []
+    for i, f in enumerate(files):
+        data = f.getvalue()
+        probs[i] = cache.lookup(backend, data, open_image(data) if perceptual else None)
+        if probs[i] is None:
+            misses.append(i)
+    errors = {}
+    for i, (_, p, error) in zip(misses, predict_many(model, [files[i] for i in misses])):
+        probs[i], errors[i] = p, error
+        if p is not None:
+            data = files[i].getvalue()
+            cache.store(backend, data, p, open_image(data))
+    return [report_row(f.name, probs[i], errors.get(i), 3) for i, f in enumerate(files)]
 
 # ---------- PAGE CONFIG ----------
 st.set_page_config(
@@ -82,12 +119,26 @@ st.markdown("<h4>Upload a car image and let AI recognize the brand & model insta
 st.markdown("---")
 
 # ---------- LOAD MODEL ----------
+backend = st.sidebar.selectbox("Inference backend", BACKENDS, index=BACKENDS.index(BACKEND))
 with st.spinner("🔄 Loading AI Model..."):
-    model = load_trained_model()
+    try:
+        model, startup = load_trained_model(backend)
+    except (OSError, ValueError, ImportError):
+        model = None
 if model is None:
-    st.error("⚠️ Failed to load the model. Ensure CarModel.h5 exists in directory.")
+    st.error("⚠️ Failed to load the model. Ensure CarModel.h5 (or CarModel.tflite, see export_model.py) exists in directory.")
     st.stop()
 st.success("✅ Model Loaded Successfully")
+with st.sidebar.expander("⏱️ Startup time"):
+    st.write(f"App imports: {startup['app_import_s']:.2f}s")
+    st.write(f"{backend} import: {startup['import_s']:.2f}s")
+    st.write(f"Model load: {startup['load_s']:.2f}s")
+    st.write(f"First inference: {startup['first_inference_s'] * 1000:.0f}ms (warm-up total {startup['warmup_s']:.2f}s)")
+perceptual = st.sidebar.checkbox("Match re-encoded / resized duplicates", value=os.getenv("CAR_PERCEPTUAL_CACHE", "0") == "1",
+                                 help="Reuse cached predictions for visually identical images (perceptual hash)")
+cache_stats = get_prediction_cache().stats()
+st.sidebar.caption(f"Prediction cache: {cache_stats['entries']} images, hit rate {cache_stats['hit_rate']:.0%} "
+                   f"({cache_stats['exact_hits']} exact, {cache_stats['perceptual_hits']} perceptual, {cache_stats['misses']} misses)")
 
 # ---------- LAYOUT: TWO COLUMNS ----------
 col1, col2 = st.columns([1,1])
@@ -96,7 +147,17 @@ col1, col2 = st.columns([1,1])
 with col1:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("📂 Upload & Classify")
-    uploaded_file = st.file_uploader("Upload a Car Image", type=['jpg','jpeg','png'])
+    uploaded_files = st.file_uploader("Upload Car Images", type=['jpg','jpeg','png'], accept_multiple_files=True)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+
+    if len(uploaded_files) > 1:
+        st.write(f"{len(uploaded_files)} images selected")
+        if st.button("🚀 Classify All"):
+            with st.spinner("🔍 Analyzing Images..."):
+                # images are decoded in parallel and classified in batches
+                rows = predict_many_cached(model, uploaded_files, backend, perceptual)
+            st.session_state.batch_results = pd.DataFrame(rows)
+            st.session_state.pop("results", None)
 
     if uploaded_file:
         image = Image.open(uploaded_file)
@@ -104,8 +165,10 @@ with col1:
 
         if st.button("🚀 Classify Car"):
             with st.spinner("🔍 Analyzing Image..."):
-                predicted_class, confidence, all_preds, pred_idx = predict_car_class(model, image)
+                predicted_class, confidence, all_preds, pred_idx = predict_car_class(
+                    model, image, backend, uploaded_file.getvalue(), perceptual)
             st.session_state.results = (predicted_class, confidence, all_preds, pred_idx, image)
+            st.session_state.pop("batch_results", None)
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ----- RIGHT BOX: Results -----
@@ -113,7 +176,11 @@ with col2:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("🏆 Classification Results")
 
-    if "results" in st.session_state:
+    if "batch_results" in st.session_state:
+        table = st.session_state.batch_results
+        st.dataframe(table, use_container_width=True)
+        st.download_button("⬇️ Download CSV", table.to_csv(index=False), "predictions.csv", "text/csv")
+    elif "results" in st.session_state:
         predicted_class, confidence, all_preds, pred_idx, image = st.session_state.results
 
         st.success(f"**Predicted Car:** {predicted_class}")
@@ -122,12 +189,8 @@ with col2:
 
         # Bar Chart
         st.subheader("📊 Prediction Probabilities")
-        fig, ax = plt.subplots(figsize=(8,5))
-        bars = ax.bar(CLASS_NAMES, all_preds*100, color='skyblue')
-        bars[pred_idx].set_color('red')
-        ax.set_ylabel("Confidence (%)")
-        plt.xticks(rotation=45)
-        st.pyplot(fig)
+        # native chart: no matplotlib import or figure rendering on each rerun
+        st.bar_chart(pd.DataFrame({"Confidence (%)": all_preds*100}, index=CLASS_NAMES))
 
         # Top 3
         st.subheader("🥇 Top 3 Predictions")
@@ -0,0 +1,73 @@
+# Batch classification of car images into a CSV of top-k predictions.
+#
+# Usage:
+#   python batch_predict.py photos/ more_photos/ -o predictions.csv --top-k 3 --batch-size 32
+#   python batch_predict.py photos/ --backend tflite
+import os
+import csv
+import time
+import argparse
+
+from car_helpers import (predict_many, top_k, load_model, BACKENDS, BACKEND, IMAGE_EXTENSIONS,
+                         BATCH_SIZE, DECODE_WORKERS)
+
+
+def collect_images(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def report_fields(k):
+    fields = ["image"]
+    for rank in range(1, k + 1):
+        fields += [f"top{rank}", f"top{rank}_prob"]
+    return fields + ["error"]
+
+
+def report_row(name, probs, error, k):
+    row = {"image": name, "error": error or ""}
+    if probs is not None:
+        for rank, (label, p) in enumerate(top_k(probs, k), 1):
+            row[f"top{rank}"] = label
+            row[f"top{rank}_prob"] = round(p, 4)
+    return row
+
+
+def write_report(rows, path, k):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=report_fields(k))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify many car images in batches")
+    parser.add_argument("images", nargs="+", help="image files or directories of images")
+    parser.add_argument("-o", "--output", default="predictions.csv")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND)
+    parser.add_argument("--model", help="model file (default CarModel.h5 / CarModel.tflite)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DECODE_WORKERS, help="image decode threads")
+    args = parser.parse_args()
+
+    files = collect_images(args.images)
+    model = load_model(args.backend, args.model)
+    start = time.perf_counter()
+    rows = [report_row(path, probs, error, args.top_k)
+            for path, probs, error in predict_many(model, files, args.batch_size, args.workers)]
+    elapsed = time.perf_counter() - start
+    write_report(rows, args.output, args.top_k)
+    failed = sum(1 for r in rows if r["error"])
+    print(f"{len(rows)} images ({failed} unreadable) in {elapsed:.1f}s "
+          f"({len(rows) / elapsed if elapsed else 0:.1f} images/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Shared preprocessing and batched inference for the car classifier app and
+# the batch CLI.
+#
+# Images are decoded and resized in a thread pool, stacked into fixed-size
+# batches and sent to the model with one call per batch. The last batch is
+# zero-padded, so the model always sees the same input shape.
+#
+# Two backends share the same predict_on_batch interface: the Keras model
+# (CarModel.h5, imports all of TensorFlow) and a quantized TFLite export of it
+# (see export_model.py) run by the standalone LiteRT / tflite-runtime
+# interpreter when one is installed.
+import io
+import os
+import time
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+CLASS_NAMES = ['Audi', 'Hyundai Creta', 'Mahindra Scorpio', 'Rolls Royce', 'Swift', 'Tata Safari', 'Toyota Innova']
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CarModel.h5")
+TFLITE_PATH = os.getenv("CAR_TFLITE_PATH", os.path.join(os.path.dirname(MODEL_PATH), "CarModel.tflite"))
+BACKENDS = ("keras", "tflite")
+BACKEND = os.getenv("CAR_MODEL_BACKEND", "keras")
+IMAGE_SIZE = (128, 128)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+BATCH_SIZE = 32
+DECODE_WORKERS = min(8, os.cpu_count() or 1)
+PREFETCH_BATCHES = 2  # batches decoded ahead of the one being predicted
+WARMUP_BATCH_SIZES = (1, BATCH_SIZE)  # input shapes used by the app and predict_many
+
+
+def load_keras_model(path=MODEL_PATH):
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+
+def tflite_interpreter_class():
+    # lightest interpreter available; full TensorFlow only as a last resort
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteModel:
+    # TFLite interpreter behind the Keras predict_on_batch interface. Each batch
+    # size gets its own interpreter, allocated once, so alternating between
+    # single images and full batches never re-allocates tensors.
+
+    def __init__(self, path=TFLITE_PATH, num_threads=None):
+        self.path = path
+        self.num_threads = num_threads or os.cpu_count()
+        self.interpreters = {}  # batch size -> interpreter allocated for that input shape
+        interpreter = self._new_interpreter()
+        self.input = interpreter.get_input_details()[0]
+        self.output = interpreter.get_output_details()[0]
+        # the exported shape (batch 1 for a Keras export) needs no resize
+        interpreter.allocate_tensors()
+        self.interpreters[int(self.input["shape"][0])] = interpreter
+
+    def _new_interpreter(self):
+        return tflite_interpreter_class()(model_path=self.path, num_threads=self.num_threads)
+
+    def _interpreter(self, batch_size):
+        interpreter = self.interpreters.get(batch_size)
+        if interpreter is None:
+            interpreter = self._new_interpreter()
+            interpreter.resize_tensor_input(self.input["index"], [batch_size, *IMAGE_SIZE, 3])
+            interpreter.allocate_tensors()
+            self.interpreters[batch_size] = interpreter
+        return interpreter
+
+    def predict_on_batch(self, batch):
+        interpreter = self._interpreter(len(batch))
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            # integer-only model: quantize the float input, saturating at the dtype's range
+            info = np.iinfo(self.input["dtype"])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+        interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"]))
+        interpreter.invoke()
+        out = interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        return (out.astype(np.float32) - zero_point) * scale if scale else out
+
+
+def load_model(backend=BACKEND, path=None):
+    if backend == "tflite":
+        return TFLiteModel(path or TFLITE_PATH)
+    if backend == "keras":
+        return load_keras_model(path or MODEL_PATH)
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def load_model_timed(backend=BACKEND, path=None):
+    # (model, startup report); the model is warmed up on every input shape it
+    # will see, so the first real request does not pay for graph tracing
+    timings = {"backend": backend}
+    start = time.perf_counter()
+    if backend == "tflite":
+        tflite_interpreter_class()
+    elif backend == "keras":
+        import tensorflow.keras.models  # noqa: F401
+    timings["import_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    model = load_model(backend, path)
+    timings["load_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for n in WARMUP_BATCH_SIZES:
+        predict_batch(model, np.zeros((n, *IMAGE_SIZE, 3), dtype=np.float32), n)
+        timings.setdefault("first_inference_s", time.perf_counter() - start)
+    timings["warmup_s"] = time.perf_counter() - start
+    return model, timings
+
+
+def preprocess_image(image):
+    # PIL image -> float32 array in [0, 1] at the model's input size
+    image = image.convert("RGB").resize(IMAGE_SIZE)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def load_image(source):
+    # file path, raw bytes or an uploaded file object
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    elif hasattr(source, "getvalue"):
+        source = io.BytesIO(source.getvalue())
+    with Image.open(source) as image:
+        return preprocess_image(image)
+
+
+def _decode(source):
+    try:
+        return load_image(source), None
+    except (OSError, ValueError) as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def predict_batch(model, arrays, batch_size=BATCH_SIZE):
+    # probabilities for up to batch_size preprocessed images, in one model call
+    batch = np.zeros((batch_size, *IMAGE_SIZE, 3), dtype=np.float32)
+    batch[:len(arrays)] = arrays
+    return np.asarray(model.predict_on_batch(batch))[:len(arrays)]
+
+
+def predict_many(model, sources, batch_size=BATCH_SIZE, workers=DECODE_WORKERS):
+    # (source, probabilities, error) per image, in input order; unreadable
+    # images get probabilities None and an error message
+    sources = iter(sources)
+    with ThreadPoolExecutor(workers) as pool:
+        pending = deque()
+
+        def submit():
+            group = list(itertools.islice(sources, batch_size))
+            if group:
+                pending.append((group, [pool.submit(_decode, s) for s in group]))
+
+        for _ in range(PREFETCH_BATCHES):
+            submit()
+        while pending:
+            group, futures = pending.popleft()
+            submit()
+            decoded = [f.result() for f in futures]
+            ok = [i for i, (array, _) in enumerate(decoded) if array is not None]
+            probs = dict(zip(ok, predict_batch(model, [decoded[i][0] for i in ok], batch_size))) if ok else {}
+            for i, source in enumerate(group):
+                yield source, probs.get(i), decoded[i][1]
+
+
+def top_k(probs, k=3):
+    # [(class name, probability)] of the k most likely classes
+    return [(CLASS_NAMES[i], float(probs[i])) for i in np.argsort(probs)[::-1][:k]]
@@ -0,0 +1,150 @@
+# Export CarModel.h5 to a quantized TFLite model and compare it with Keras.
+#
+#   float16 - float16 weights, about half the size, near-identical outputs
+#   int8    - int8 weights and activations, calibrated on --calibration images
+#   dynamic - int8 weights only, no calibration data needed
+#
+# After exporting, the script checks top-1 agreement and probability drift
+# against the Keras model and profiles both backends in separate processes
+# (load time, first / steady-state latency, peak RSS).
+#
+# Usage:
+#   python export_model.py --quantize int8 --calibration photos/ --check photos/ --report export_report.json
+#   streamlit run app.py   # then pick the tflite backend (or CAR_MODEL_BACKEND=tflite)
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+from car_helpers import load_model, _decode, predict_batch, MODEL_PATH, TFLITE_PATH, IMAGE_SIZE, BACKENDS
+from batch_predict import collect_images
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CALIBRATION_IMAGES = 200
+CHECK_IMAGES = 200
+PROFILE_RUNS = 50
+
+
+def sample_arrays(paths, n, seed=0):
+    # up to n preprocessed images, or uniform noise when no images are given;
+    # unreadable files are skipped, as in batch_predict
+    arrays = []
+    for f in collect_images(paths) if paths else []:
+        array, error = _decode(f)
+        if error:
+            print(f"Skipping {f}: {error}")
+            continue
+        arrays.append(array)
+        if len(arrays) >= n:
+            break
+    if not arrays:
+        print("No readable images given: using random inputs (real photos give a more meaningful check)")
+        return np.random.default_rng(seed).random((n, *IMAGE_SIZE, 3), dtype=np.float32)
+    return np.stack(arrays)
+
+
+def export(keras_path, output, quantize, calibration):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(keras_path))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        # inputs and outputs stay float32, so callers need no changes
+        converter.representative_dataset = lambda: ([a[None]] for a in calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+    return os.path.getsize(output)
+
+
+def parity(reference, candidate, arrays, batch_size=32):
+    ref = np.concatenate([predict_batch(reference, arrays[i:i + batch_size], batch_size)
+                          for i in range(0, len(arrays), batch_size)])
+    out = np.concatenate([predict_batch(candidate, arrays[i:i + batch_size], batch_size)
+                          for i in range(0, len(arrays), batch_size)])
+    diff = np.abs(ref - out)
+    return {"images": len(arrays), "top1_agreement": float(np.mean(ref.argmax(1) == out.argmax(1))),
+            "max_abs_diff": float(diff.max()), "mean_abs_diff": float(diff.mean())}
+
+
+def peak_rss_mb():
+    # VmHWM is reset by exec, unlike ru_maxrss which a subprocess inherits from its parent
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def profile(backend, path, runs=PROFILE_RUNS):
+    # run in a fresh process so import time and peak RSS belong to this backend only
+    start = time.perf_counter()
+    model = load_model(backend, path)
+    load_s = time.perf_counter() - start
+    image = np.random.default_rng(0).random((1, *IMAGE_SIZE, 3), dtype=np.float32)
+    start = time.perf_counter()
+    predict_batch(model, image, 1)
+    first_ms = 1000 * (time.perf_counter() - start)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predict_batch(model, image, 1)
+        times.append(1000 * (time.perf_counter() - start))
+    rss = peak_rss_mb()
+    return {"backend": backend, "model_bytes": os.path.getsize(path), "import_and_load_s": round(load_s, 3),
+            "first_inference_ms": round(first_ms, 2), "median_latency_ms": round(float(np.median(times)), 2),
+            "peak_rss_mb": round(rss, 1) if rss is not None else None}
+
+
+def profile_in_subprocess(backend, path):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--profile", backend, "--model", path],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export CarModel.h5 to quantized TFLite and compare backends")
+    parser.add_argument("--keras-model", default=MODEL_PATH)
+    parser.add_argument("-o", "--output", default=TFLITE_PATH)
+    parser.add_argument("--quantize", choices=("float16", "int8", "dynamic"), default="float16")
+    parser.add_argument("--calibration", nargs="*", default=[], help="images or directories for int8 calibration")
+    parser.add_argument("--check", nargs="*", default=[], help="images or directories for the parity check")
+    parser.add_argument("--report", help="write the export / parity / profile report as JSON")
+    parser.add_argument("--profile", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--model", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(profile(args.profile, args.model)))
+        return
+
+    calibration = sample_arrays(args.calibration, CALIBRATION_IMAGES) if args.quantize == "int8" else None
+    report = {"quantize": args.quantize, "keras_bytes": os.path.getsize(args.keras_model),
+              "tflite_bytes": export(args.keras_model, args.output, args.quantize, calibration)}
+    report["parity"] = parity(load_model("keras", args.keras_model), load_model("tflite", args.output),
+                              sample_arrays(args.check, CHECK_IMAGES, seed=1))
+    report["profile"] = [profile_in_subprocess("keras", args.keras_model), profile_in_subprocess("tflite", args.output)]
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# In-memory LRU cache of car classifier predictions.
+#
+# Entries are keyed by (backend, SHA-256 of the uploaded bytes) and hold the
+# full probability vector, so the chart and top-3 view render without
+# preprocessing or inference. In perceptual mode a lookup that misses on the
+# exact hash also matches any cached image whose 64-bit difference hash is
+# within max_distance bits, which catches re-encoded and resized copies.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+PREDICTION_CACHE_SIZE = 1024
+PHASH_MAX_DISTANCE = 4  # of 64 bits
+
+
+def dhash(image, size=8):
+    # difference hash: brightness gradient of a (size+1) x size thumbnail
+    pixels = np.asarray(image.convert("L").resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, max_distance=PHASH_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.hits = {"exact": 0, "perceptual": 0}
+        self.misses = 0
+        self._entries = OrderedDict()  # (backend, sha256) -> (dhash or None, probabilities)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(backend, data):
+        return backend, hashlib.sha256(data).hexdigest()
+
+    def lookup(self, backend, data, image=None):
+        # probabilities for these image bytes, or None; pass the decoded image
+        # to also match perceptual near-duplicates
+        key = self.key(backend, data)
+        phash = dhash(image) if image is not None else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry[1]
+            if phash is not None:
+                for other, (other_hash, probs) in self._entries.items():
+                    if other[0] == backend and other_hash is not None and bin(other_hash ^ phash).count("1") <= self.max_distance:
+                        self._entries.move_to_end(other)
+                        self.hits["perceptual"] += 1
+                        return probs
+            self.misses += 1
+            return None
+
+    def store(self, backend, data, probs, image=None):
+        probs = np.array(probs, dtype=np.float32)
+        probs.flags.writeable = False
+        entry = (dhash(image) if image is not None else None, probs)
+        with self._lock:
+            self._entries[self.key(backend, data)] = entry
+            self._entries.move_to_end(self.key(backend, data))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {"entries": len(self._entries), "exact_hits": self.hits["exact"], "perceptual_hits": self.hits["perceptual"],
+                "misses": self.misses, "hit_rate": hits / total if total else 0.0}
@@ -18,33 +18,90 @@ except RuntimeError:
 
 
 import streamlit as st
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_google_genai import  GoogleGenerativeAIEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 import os
+import hashlib
+import shutil
 load_dotenv()
 
-st.set_page_config(page_title="Chat with PDF", page_icon=":books:")
-st.title("RAG application built on Gemini model")
-
-loader = PyPDFLoader("INTRODUCTION TO CNN.pdf")
-data = loader.load()
-
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+# shared helpers live in ../common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_extract import iter_pdf_pages
+from common.embedding_cache import cached_embeddings
+from common.embedding_pipeline import EmbeddingPipeline
+from common.answer_cache import SemanticAnswerCache
+from common.streaming import TimedStream
 
-docs = text_splitter.split_documents(data)
 
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-
-vectorstore = Chroma.from_documents(documents=docs, embedding=GoogleGenerativeAIEmbeddings(model="models/embedding-001") )
+st.set_page_config(page_title="Chat with PDF", page_icon=":books:")
+st.title("RAG application built on Gemini model")
 
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k" :10} )
+PDF_PATH = "INTRODUCTION TO CNN.pdf"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+EMBEDDING_MODEL = "models/embedding-001"
+EMBED_BATCH_SIZE = 100
+EMBED_IN_FLIGHT = 4
+RETRIEVAL_K = 10
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine similarity for "same question"
+ANSWER_CACHE_TTL = 24 * 3600
+ANSWER_CACHE_SIZE = 1000
+PERSIST_ROOT = "chroma_db"
+BUILD_MARKER = ".complete"
+
+# ----------------- VECTOR STORE -----------------
+@st.cache_data
+def index_key(pdf_path, mtime, chunk_size, chunk_overlap):
+    # mtime is only part of the cache key so an edited PDF is re-hashed
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(f"|{chunk_size}|{chunk_overlap}|{EMBEDDING_MODEL}".encode())
+    return h.hexdigest()[:16]
+
+def build_vectorstore(persist_dir, embeddings):
+    # same metadata layout as PyPDFLoader (0-based page)
+    data = (Document(page_content=r.text, metadata={"source": PDF_PATH, "page": r.page - 1}) for r in iter_pdf_pages([PDF_PATH]))
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    docs = text_splitter.split_documents(data)
+    vectorstore = Chroma.from_documents(documents=docs, embedding=embeddings, persist_directory=persist_dir)
+    # only a fully written collection is ever reopened
+    open(os.path.join(persist_dir, BUILD_MARKER), "w").close()
+    return vectorstore
+
+@st.cache_resource
+def load_vectorstore(key):
+    persist_dir = os.path.join(PERSIST_ROOT, key)
+    # cache misses are embedded in concurrent batches, backing off on quota errors
+    pipeline = EmbeddingPipeline(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+                                 batch_size=EMBED_BATCH_SIZE, max_in_flight=EMBED_IN_FLIGHT)
+    # chunk embeddings are read through the shared on-disk cache
+    embeddings = cached_embeddings(pipeline, EMBEDDING_MODEL)
+    if os.path.exists(os.path.join(persist_dir, BUILD_MARKER)):
+        return Chroma(persist_directory=persist_dir, embedding_function=embeddings)
+
+    # document or chunking settings changed: drop stale collections and rebuild
+    if os.path.isdir(PERSIST_ROOT):
+        for name in os.listdir(PERSIST_ROOT):
+            shutil.rmtree(os.path.join(PERSIST_ROOT, name), ignore_errors=True)
+    os.makedirs(persist_dir, exist_ok=True)
+    return build_vectorstore(persist_dir, embeddings)
+
+@st.cache_resource
+def get_answer_cache():
+    # entries are tied to the index key, so a rebuilt collection invalidates them
+    return SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE)
+
+key = index_key(PDF_PATH, os.path.getmtime(PDF_PATH), CHUNK_SIZE, CHUNK_OVERLAP)
+vectorstore = load_vectorstore(key)
 
 llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash",temperature=0.3, max_tokens=500)
 
@@ -70,8 +127,22 @@ prompt = ChatPromptTemplate.from_messages(
 )
 
 if query:
-    question_answer_chain = create_stuff_documents_chain(llm=llm, prompt=prompt)
-    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-    response = rag_chain.invoke({"input": query})
+    answer_cache = get_answer_cache()
+    query_vector = vectorstore.embeddings.embed_query(query)
+    answer = answer_cache.lookup(query_vector, key)
     st.write("You asked: ", query)
-    st.write("Answer: ", response["answer"])
\ No newline at end of file
+    if answer is not None:
+        st.write("Answer: ", answer)
+        st.caption("Answered from cache")
+    else:
+        docs = vectorstore.similarity_search_by_vector(query_vector, k=RETRIEVAL_K)
+        # sources are shown before generation starts
+        pages = sorted({d.metadata["page"] + 1 for d in docs if "page" in d.metadata})
+        st.caption(f"Sources: {os.path.basename(PDF_PATH)}, pages " + ", ".join(map(str, pages)))
+
+        question_answer_chain = create_stuff_documents_chain(llm=llm, prompt=prompt)
+        stream = TimedStream(question_answer_chain.stream({"input": query, "context": docs}))
+        st.write("Answer: ")
+        st.write_stream(iter(stream))
+        st.caption(stream.summary())
+        answer_cache.store(query_vector, key, query, stream.text)
\ No newline at end of file
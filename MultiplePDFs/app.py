@@ -2,15 +2,48 @@ import streamlit as st
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 import google.generativeai as genai
 import os
+import sys
+import json
+import shutil
+import hashlib
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import FAISS
-from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+# shared helpers live in ../common
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_extract import iter_pdf_pages
+from common.chunking import chunk_pages
+from common.embedding_cache import cached_embeddings
+from common.embedding_pipeline import EmbeddingPipeline
+from common.answer_cache import SemanticAnswerCache
+from common.streaming import TimedStream
+from common.lexical import BM25, content_tokens
+from common.retrieval import reciprocal_rank_fusion, load_reranker, rerank
+from index_factory import (build_store, rebuild_store, load_store, save_store, store_dir, store_exists, chunk_ids,
+                           needs_retrain, remove_chunks, cache_capacity, MMAP)
+import chunk_store
+
 # ---------------- CONFIG ----------------
+INDEX_DIR = "faiss_index"
+MANIFEST_PATH = os.path.join(INDEX_DIR, "manifest.json")
+BM25_PATH = os.path.join(INDEX_DIR, "bm25.json")
+EMBEDDING_MODEL = "models/embedding-001"
+CHUNK_TOKENS = 500         # model tokens per chunk (was 2000 characters)
+CHUNK_OVERLAP_TOKENS = 50
+EMBED_BATCH_SIZE = 100
+EMBED_IN_FLIGHT = 4
+# chunk vectors kept on disk; a retrain or HNSW delete re-embeds whatever the cache has evicted
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1000000"))
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine similarity for "same question"
+ANSWER_CACHE_TTL = 24 * 3600
+ANSWER_CACHE_SIZE = 1000
+RETRIEVAL_K = 5            # chunks passed to the chain without a reranker
+HYBRID_CANDIDATES = 20     # candidates taken from each of BM25 and FAISS
+RERANK_TOP_N = 3           # chunks passed to the chain after reranking
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
@@ -95,23 +128,187 @@ st.markdown(
 )
 
 # ----------------- HELPERS -----------------
-def get_pdf_text(pdf_docs):
-    text = ""
+def get_pdf_chunks(pdfs):
+    # one list of chunks per PDF, in order; pages of all files are extracted in
+    # a single process pool. Chunks never cross files and remember their pages.
+    chunks = [[] for _ in pdfs]
+    pages = iter_pdf_pages(pdfs)
+    for chunk in chunk_pages(pages, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+        chunks[chunk.doc].append(chunk)
+    return chunks
+
+def source_label(doc):
+    source = doc.metadata.get("source")
+    if source is None or "page" not in doc.metadata:
+        return source
+    first, last = doc.metadata["page"], doc.metadata.get("page_end", doc.metadata["page"])
+    return f"{source} p. {first}" if first == last else f"{source} pp. {first}-{last}"
+
+def load_manifest():
+    # doc_id -> {"name", "chunk_ids"} for every document in the index
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def document_id(pdf):
+    return hashlib.sha256(pdf.getvalue()).hexdigest()[:16]
+
+@st.cache_resource
+def get_embeddings():
+    # cache misses are embedded in concurrent batches, backing off on quota errors
+    pipeline = EmbeddingPipeline(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+                                 batch_size=EMBED_BATCH_SIZE, max_in_flight=EMBED_IN_FLIGHT)
+    # chunk embeddings are read through the shared on-disk cache
+    return cached_embeddings(pipeline, EMBEDDING_MODEL, max_entries=EMBEDDING_CACHE_SIZE)
+
+def check_embedding_cache(n_chunks):
+    # rebuilding the index reads every chunk vector back from the embedding cache
+    capacity = cache_capacity(get_embeddings())
+    if capacity is not None and n_chunks > capacity:
+        st.warning(f"The knowledge base has {n_chunks} chunks but the embedding cache holds {capacity}: "
+                   "rebuilding the index re-embeds the evicted ones. Raise EMBEDDING_CACHE_SIZE.")
+
+def index_fingerprint():
+    # changes whenever the index is re-saved (a new generation directory),
+    # which invalidates the cached store
+    folder = store_dir(INDEX_DIR)
+    names = ("index.faiss", "index.pkl", chunk_store.CHUNKS_FILE, chunk_store.OFFSETS_FILE)
+    stats = [os.stat(os.path.join(folder, n)) for n in names if os.path.exists(os.path.join(folder, n))]
+    return (folder,) + tuple((s.st_mtime_ns, s.st_size) for s in stats)
+
+@st.cache_resource(max_entries=1)
+def get_cached_vector_store(fingerprint):
+    # shared by every session; only the store for the current index is kept resident
+    # chunk text is read from disk on demand, so memory does not grow with the corpus
+    return load_vector_store(get_embeddings(), mmap=MMAP, lazy=True)
+
+@st.cache_resource(max_entries=1)
+def get_cached_bm25_index(fingerprint):
+    return load_bm25_index(get_cached_vector_store(fingerprint))
+
+@st.cache_resource
+def get_reranker():
+    # None unless RERANKER_MODEL is set and sentence-transformers is installed
+    return load_reranker(RERANKER_MODEL)
+
+def load_bm25_index(vector_store):
+    # (chunk ids, BM25) kept next to the FAISS files; rebuilt from the docstore
+    # when missing or out of sync (e.g. an index built before hybrid search)
+    store_ids = chunk_ids(vector_store) if vector_store else []
+    if os.path.exists(BM25_PATH):
+        with open(BM25_PATH) as f:
+            data = json.load(f)
+        if set(data["ids"]) == set(store_ids):
+            return data["ids"], BM25.from_dict(data["bm25"])
+    docs = [vector_store.docstore.search(i) for i in store_ids]
+    return store_ids, BM25([content_tokens(d.page_content) for d in docs])
+
+def save_bm25_index(ids, bm25):
+    tmp_path = BM25_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"ids": ids, "bm25": bm25.to_dict()}, f)
+    os.replace(tmp_path, BM25_PATH)
+
+def load_vector_store(embeddings, mmap=False, lazy=False):
+    if not store_exists(INDEX_DIR):
+        return None
+    return load_store(INDEX_DIR, embeddings, mmap=mmap, lazy=lazy)
+
+def get_vector_store(pdf_docs, rebuild=False):
+    if rebuild:
+        shutil.rmtree(INDEX_DIR, ignore_errors=True)
+    embeddings = get_embeddings()
+    vector_store = load_vector_store(embeddings)
+    manifest = load_manifest()
+    bm25_ids, bm25 = load_bm25_index(vector_store)
+
+    added, skipped, empty = [], [], []
+    new_pdfs = {}  # doc_id -> upload not yet in the index
     for pdf in pdf_docs:
-        pdf_reader = PdfReader(pdf)
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    return text
+        doc_id = document_id(pdf)
+        if doc_id in manifest or doc_id in new_pdfs:
+            skipped.append(pdf.name)
+        else:
+            new_pdfs[doc_id] = pdf
 
-def get_text_chunks(text):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
-    return splitter.split_text(text)
+    text_chunks, metadatas, ids = [], [], []
+    for (doc_id, pdf), chunks in zip(new_pdfs.items(), get_pdf_chunks(list(new_pdfs.values()))):
+        if not chunks:
+            # no extractable text (e.g. a scanned PDF): nothing to index
+            empty.append(pdf.name)
+            continue
+        doc_chunk_ids = [f"{doc_id}-{i}" for i in range(len(chunks))]
+        text_chunks.extend(c.text for c in chunks)
+        metadatas.extend({"source": pdf.name, "doc_id": doc_id, "page": c.page, "page_end": c.page_end} for c in chunks)
+        ids.extend(doc_chunk_ids)
+        manifest[doc_id] = {"name": pdf.name, "chunk_ids": doc_chunk_ids}
+        added.append(pdf.name)
 
-def get_vector_store(text_chunks):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-    vector_store.save_local("faiss_index")
+    if added:
+        # the chunks of every new document are embedded in one call, so the
+        # pipeline keeps max_in_flight batches busy across documents
+        if vector_store is None:
+            # index type (flat / IVF-PQ / HNSW) is chosen and trained on the first upload;
+            # IVF indexes are retrained below as the corpus grows
+            vector_store = build_store(text_chunks, embeddings, metadatas=metadatas, ids=ids)
+        else:
+            vector_store.add_texts(text_chunks, metadatas=metadatas, ids=ids)
+        bm25.add(content_tokens(chunk) for chunk in text_chunks)
+        bm25_ids.extend(ids)
+        if needs_retrain(vector_store.index):
+            check_embedding_cache(vector_store.index.ntotal)
+            vector_store = rebuild_store(vector_store, embeddings)
+        save_store(vector_store, INDEX_DIR)
+        save_bm25_index(bm25_ids, bm25)
+        save_manifest(manifest)
+    return added, skipped, empty
 
+def remove_from_vector_store(doc_id):
+    manifest = load_manifest()
+    entry = manifest.pop(doc_id, None)
+    if entry is None:
+        return False
+    vector_store = load_vector_store(get_embeddings())
+    bm25_ids, bm25 = load_bm25_index(vector_store)
+    removed = set(entry["chunk_ids"])
+    bm25.remove(i for i, chunk_id in enumerate(bm25_ids) if chunk_id in removed)
+    if not remove_chunks(vector_store, entry["chunk_ids"]):
+        # HNSW cannot remove vectors: rebuild from the remaining chunks, whose
+        # embeddings are read back from the embedding cache
+        check_embedding_cache(vector_store.index.ntotal - len(removed))
+        vector_store = rebuild_store(vector_store, get_embeddings(),
+                                     [i for i in chunk_ids(vector_store) if i not in removed])
+        if vector_store is None:
+            # last document removed: start again from an empty knowledge base
+            shutil.rmtree(INDEX_DIR, ignore_errors=True)
+            os.makedirs(INDEX_DIR)
+            save_manifest(manifest)
+            return True
+    save_store(vector_store, INDEX_DIR)
+    save_bm25_index([chunk_id for chunk_id in bm25_ids if chunk_id not in removed], bm25)
+    save_manifest(manifest)
+    return True
+
+def retrain_vector_store():
+    # re-sizes and retrains the index for the current corpus (e.g. after
+    # changing FAISS_INDEX_FACTORY); chunk ids, BM25 and the manifest are unchanged
+    vector_store = load_vector_store(get_embeddings())
+    if vector_store is not None:
+        check_embedding_cache(vector_store.index.ntotal)
+        vector_store = rebuild_store(vector_store, get_embeddings())
+    if vector_store is None:
+        return False
+    save_store(vector_store, INDEX_DIR)
+    return True
+
+@st.cache_resource
 def get_conversational_chain():
     prompt_template = """
     Answer the question as detailed as possible from the provided context. 
@@ -125,17 +322,58 @@ def get_conversational_chain():
     """
     model = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.3)
     prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-    return load_qa_chain(model, chain_type="stuff", prompt=prompt)
+    # "stuff" chain: retrieved chunks are joined into {context}, answer tokens are streamed
+    return prompt | model | StrOutputParser()
+
+@st.cache_resource
+def get_answer_cache():
+    # entries are tied to the index fingerprint, so a re-saved index invalidates them
+    return SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE)
+
+def retrieve(vector_store, bm25_index, question, query_vector):
+    # hybrid retrieval: FAISS and BM25 candidates fused with reciprocal rank
+    # fusion, then optionally reranked by a local cross-encoder
+    vector_docs = vector_store.similarity_search_by_vector(query_vector, k=HYBRID_CANDIDATES)
+    bm25_ids, bm25 = bm25_index
+    lexical_docs = [vector_store.docstore.search(bm25_ids[i]) for i, _ in bm25.top_k(content_tokens(question), HYBRID_CANDIDATES)]
+    lexical_docs = [d for d in lexical_docs if hasattr(d, "page_content")]
+    fused = reciprocal_rank_fusion([vector_docs, lexical_docs], key=lambda d: d.page_content)
+    reranker = get_reranker()
+    if reranker is not None:
+        return rerank(reranker, question, fused[:HYBRID_CANDIDATES], RERANK_TOP_N)
+    return fused[:RETRIEVAL_K]
 
 def user_input(user_question):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    new_db = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
-    docs = new_db.similarity_search(user_question, k=5)
-    chain = get_conversational_chain()
-    response = chain({"input_documents": docs, "question": user_question}, return_only_outputs=True)
+    if not store_exists(INDEX_DIR):
+        st.warning("No knowledge base yet. Upload PDFs and click Submit & Process first.")
+        return
+    fingerprint = index_fingerprint()
+    new_db = get_cached_vector_store(fingerprint)
+    # the question is embedded once, for both the answer cache and the search
+    query_vector = get_embeddings().embed_query(user_question)
+    answer_cache = get_answer_cache()
+    answer = answer_cache.lookup(query_vector, fingerprint)
 
     st.markdown(f"<div class='chat-bubble user-question'><b>You:</b> {user_question}</div>", unsafe_allow_html=True)
-    st.markdown(f"<div class='chat-bubble'><b>Gemini:</b> {response['output_text']}</div>", unsafe_allow_html=True)
+    if answer is not None:
+        st.markdown(f"<div class='chat-bubble'><b>Gemini:</b> {answer}</div>", unsafe_allow_html=True)
+        st.caption("Answered from cache")
+        return
+
+    docs = retrieve(new_db, get_cached_bm25_index(fingerprint), user_question, query_vector)
+    # sources are shown before generation starts
+    sources = sorted({source_label(d) for d in docs if "source" in d.metadata})
+    if sources:
+        st.caption("Sources: " + ", ".join(sources))
+
+    context = "\n\n".join(d.page_content for d in docs)
+    stream = TimedStream(get_conversational_chain().stream({"context": context, "question": user_question}))
+    bubble = st.empty()
+    for _ in stream:
+        bubble.markdown(f"<div class='chat-bubble'><b>Gemini:</b> {stream.text}▌</div>", unsafe_allow_html=True)
+    bubble.markdown(f"<div class='chat-bubble'><b>Gemini:</b> {stream.text}</div>", unsafe_allow_html=True)
+    st.caption(stream.summary())
+    answer_cache.store(query_vector, fingerprint, user_question, stream.text)
 
 # ----------------- LAYOUT -----------------
 st.title("📚 Chat with Multiple PDFs using Gemini")
@@ -152,9 +390,33 @@ with st.sidebar:
     st.title("📂 Menu")
     pdf_docs = st.file_uploader("Upload your PDF Files", accept_multiple_files=True, type=["pdf"])
 
+    rebuild = st.checkbox("Rebuild index from scratch", value=False)
+
     if st.button("⚡ Submit & Process"):
         with st.spinner("Processing PDFs..."):
-            raw_text = get_pdf_text(pdf_docs)
-            text_chunks = get_text_chunks(raw_text)
-            get_vector_store(text_chunks)
-            st.success("✅ PDFs processed successfully! Now ask your questions above.")
+            added, skipped, empty = get_vector_store(pdf_docs, rebuild=rebuild)
+        if added:
+            st.success(f"✅ Indexed {len(added)} new PDF(s)! Now ask your questions above.")
+        metrics = get_embeddings().embeddings.metrics
+        if metrics["chunks"]:
+            st.caption(f"Embedded {metrics['chunks']} chunks at {metrics['chunks_per_sec']:.1f} chunks/s "
+                       f"(~{metrics['tokens_per_sec']:.0f} tokens/s, {metrics['retries']} retries)")
+        if skipped:
+            st.info(f"Skipped {len(skipped)} already indexed PDF(s): {', '.join(skipped)}")
+        if empty:
+            st.warning(f"No extractable text in {len(empty)} PDF(s), not indexed: {', '.join(empty)}")
+
+    if st.button("🔁 Retrain index"):
+        with st.spinner("Retraining index..."):
+            retrained = retrain_vector_store()
+        if retrained:
+            st.success("Index retrained for the current corpus.")
+
+    manifest = load_manifest()
+    if manifest:
+        st.markdown("---")
+        doc_id = st.selectbox("Indexed documents", list(manifest), format_func=lambda d: manifest[d]["name"])
+        if st.button("🗑️ Remove document"):
+            with st.spinner("Removing document..."):
+                remove_from_vector_store(doc_id)
+            st.success(f"Removed {manifest[doc_id]['name']} from the index.")
@@ -0,0 +1,114 @@
+# On-disk chunk store replacing the pickled FAISS docstore (index.pkl).
+#
+# Files (next to index.faiss):
+#   chunks.jsonl        - one JSON record {"id", "text", "metadata"} per line, in FAISS vector order
+#   chunks_offsets.npy  - (offset, length) of each record, indexed by FAISS position
+#   chunks_ids.npy      - chunk ids, sorted, as fixed-width bytes
+#   chunks_id_pos.npy   - FAISS position of each id in chunks_ids.npy
+# Everything is memory-mapped, so a query reads only the k records it returns
+# and resident memory does not grow with the corpus. No pickle is involved.
+import os
+import json
+import mmap
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunks_offsets.npy"
+IDS_FILE = "chunks_ids.npy"
+ID_POS_FILE = "chunks_id_pos.npy"
+
+
+def exists(folder):
+    return all(os.path.exists(os.path.join(folder, name)) for name in (CHUNKS_FILE, OFFSETS_FILE, IDS_FILE, ID_POS_FILE))
+
+
+def save(folder, index_to_docstore_id, docstore):
+    # rewritten in full on every save, which also compacts deleted chunks
+    n = len(index_to_docstore_id)
+    offsets = np.zeros((n, 2), dtype=np.int64)
+    ids = []
+    tmp = {name: os.path.join(folder, name + ".tmp") for name in (CHUNKS_FILE, OFFSETS_FILE, IDS_FILE, ID_POS_FILE)}
+    with open(tmp[CHUNKS_FILE], "wb") as f:
+        for pos in range(n):
+            chunk_id = index_to_docstore_id[pos]
+            doc = docstore.search(chunk_id)
+            line = json.dumps({"id": chunk_id, "text": doc.page_content, "metadata": doc.metadata}).encode("utf-8")
+            offsets[pos] = (f.tell(), len(line))
+            f.write(line + b"\n")
+            ids.append(chunk_id.encode("utf-8"))
+
+    id_array = np.array(ids, dtype=f"S{max(map(len, ids), default=1)}")
+    order = np.argsort(id_array, kind="stable")
+    for name, array in ((OFFSETS_FILE, offsets), (IDS_FILE, id_array[order]), (ID_POS_FILE, order.astype(np.int64))):
+        with open(tmp[name], "wb") as f:
+            np.save(f, array)
+    for name, path in tmp.items():
+        os.replace(path, os.path.join(folder, name))
+
+
+class ChunkStore(Docstore):
+    # read-only, lazily loaded docstore over the files written by save()
+
+    def __init__(self, folder):
+        self._file = open(os.path.join(folder, CHUNKS_FILE), "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self._file.name) else b""
+        self._offsets = np.load(os.path.join(folder, OFFSETS_FILE), mmap_mode="r")
+        self._ids = np.load(os.path.join(folder, IDS_FILE), mmap_mode="r")
+        self._id_pos = np.load(os.path.join(folder, ID_POS_FILE), mmap_mode="r")
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def record(self, pos):
+        offset, length = self._offsets[pos]
+        return json.loads(self._data[offset:offset + length])
+
+    def position(self, chunk_id):
+        key = chunk_id.encode("utf-8")
+        i = int(np.searchsorted(self._ids, key))
+        if i < len(self._ids) and self._ids[i] == key:
+            return int(self._id_pos[i])
+        return None
+
+    def ids(self):
+        return [i.decode("utf-8") for i in self._ids]
+
+    def search(self, search):
+        pos = self.position(search)
+        if pos is None:
+            return f"ID {search} not found."
+        record = self.record(pos)
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    def load_all(self):
+        # (InMemoryDocstore, index_to_docstore_id) for the ingestion path
+        docs, index_to_docstore_id = {}, {}
+        for pos in range(len(self)):
+            record = self.record(pos)
+            docs[record["id"]] = Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+            index_to_docstore_id[pos] = record["id"]
+        return InMemoryDocstore(docs), index_to_docstore_id
+
+
+class ChunkIdMap(Mapping):
+    # FAISS position -> chunk id, read from the chunk store on demand
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, pos):
+        pos = int(pos)
+        if not 0 <= pos < len(self._store):
+            raise KeyError(pos)
+        return self._store.record(pos)["id"]
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        return iter(range(len(self._store)))
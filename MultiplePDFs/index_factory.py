@@ -0,0 +1,306 @@
+# Configurable FAISS index types for the MultiplePDFs knowledge base.
+#
+# FAISS_INDEX_FACTORY selects the index built for a new knowledge base:
+#   flat   - exact search (default)
+#   ivfpq  - inverted lists + product quantization; nlist scales with the corpus,
+#            and the index is retrained from the embedding cache once the
+#            corpus outgrows it (needs_retrain / rebuild_store)
+#   hnsw   - graph index, no training step
+# or any raw faiss.index_factory string such as "IVF4096,PQ64" or "HNSW64".
+# Search-time accuracy/speed is tuned with FAISS_NPROBE (IVF) and
+# FAISS_EF_SEARCH (HNSW). FAISS_MMAP=1 memory-maps index.faiss when the
+# query-side store is loaded instead of reading it into RAM. Chunk text and
+# metadata live in chunk_store.py files next to index.faiss.
+#
+# Every save writes a new generation directory (gen-<time>) and then points
+# the CURRENT file at it, so files a running query-side store has open or
+# memory-mapped are never replaced (Windows refuses to); old generations are
+# deleted once nothing holds them.
+#
+# Benchmark recall@k of each index type against exact search:
+#   python index_factory.py --vectors 100000 --dim 768 --queries 500 --k 10
+import os
+import json
+import time
+import pickle
+import shutil
+import argparse
+
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+import chunk_store
+
+INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "flat")
+NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+MMAP = os.getenv("FAISS_MMAP", "0") == "1"
+
+PQ_M_CHOICES = (64, 48, 32, 16, 8, 4, 2, 1)  # PQ sub-quantizers, at least 8 dims each
+MIN_POINTS_PER_LIST = 39  # faiss' own lower bound for k-means training
+PQ_MIN_TRAINING = MIN_POINTS_PER_LIST * 256  # 9984: below this faiss warns that 8-bit PQ code books are under-trained
+RETRAIN_GROWTH = 2  # retrain once the corpus calls for this many times more IVF lists
+
+
+def factory_string(kind, dim, n_vectors):
+    name = kind.lower()
+    if name == "flat":
+        return "Flat"
+    if name == "hnsw":
+        return "HNSW32"
+    if name == "ivfpq":
+        nlist = max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // MIN_POINTS_PER_LIST))
+        m = next(m for m in PQ_M_CHOICES if dim % m == 0 and m <= max(1, dim // 8))
+        return f"IVF{nlist},PQ{m}"
+    return kind
+
+
+def ivf_lists(spec):
+    # nlist of an "IVF<nlist>,..." factory string, None for other index types
+    if not spec.startswith("IVF"):
+        return None
+    return int(spec.split(",")[0][3:].split("_")[0])
+
+
+def needs_more_training_data(spec, n_vectors):
+    # IVF k-means needs MIN_POINTS_PER_LIST points per list, and each PQ code
+    # book (256 centroids) as many per centroid
+    nlist = ivf_lists(spec)
+    if nlist is not None and n_vectors < nlist * MIN_POINTS_PER_LIST:
+        return True
+    return "PQ" in spec and n_vectors < PQ_MIN_TRAINING
+
+
+def needs_retrain(index, kind=INDEX_FACTORY):
+    # True once the corpus has outgrown the index it was trained on: a flat
+    # fallback that now has enough vectors for the configured IVF index, or an
+    # IVF index whose nlist is RETRAIN_GROWTH times too small for the corpus
+    target = factory_string(kind, index.d, index.ntotal)
+    target_lists = ivf_lists(target)
+    if target_lists is None or needs_more_training_data(target, index.ntotal):
+        return False
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+    return target_lists >= RETRAIN_GROWTH * ivf.nlist
+
+
+def supports_remove(index):
+    # flat and IVF indexes can drop vectors in place (see remove_chunks);
+    # graph indexes (HNSW) cannot remove vectors at all
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat) or faiss.try_extract_index_ivf(index) is not None
+
+
+def compact_ivf_labels(ivf):
+    # IVF remove_ids keeps the survivors' old labels, while FAISS.delete
+    # renumbers index_to_docstore_id as 0..n-1 in label order: relabel the
+    # inverted lists the same way. Touches only the stored ids, no training.
+    # (An IndexIDMap2 around the IVF index does not help: its remove_ids
+    # compacts the id map but not the IVF's own ids, mislabelling results.)
+    invlists = ivf.invlists
+    sizes = [invlists.list_size(l) for l in range(ivf.nlist)]
+    ids = [faiss.rev_swig_ptr(invlists.get_ids(l), n).copy() if n else None for l, n in enumerate(sizes)]
+    labels = np.sort(np.concatenate([i for i in ids if i is not None] or [np.empty(0, np.int64)]))
+    for l, n in enumerate(sizes):
+        if not n:
+            continue
+        new_ids = np.searchsorted(labels, ids[l]).astype(np.int64)
+        codes = faiss.rev_swig_ptr(invlists.get_codes(l), n * invlists.code_size).copy()
+        invlists.update_entries(l, 0, n, faiss.swig_ptr(new_ids), faiss.swig_ptr(codes))
+
+
+def remove_chunks(store, ids):
+    # deletes the chunks in place and returns True, or False (store untouched)
+    # for indexes that must be rebuilt without them instead
+    if not supports_remove(store.index):
+        return False
+    store.delete(ids=ids)
+    ivf = faiss.try_extract_index_ivf(store.index)
+    if ivf is not None:
+        compact_ivf_labels(ivf)
+    return True
+
+
+def cache_capacity(embeddings):
+    # chunk vectors the embedding cache can hold, None for uncached embeddings
+    return getattr(getattr(embeddings, "cache", None), "max_entries", None)
+
+
+def make_index(vectors, kind=INDEX_FACTORY):
+    # trained (if required) but still empty index for these vectors
+    n_vectors, dim = vectors.shape
+    spec = factory_string(kind, dim, n_vectors)
+    if needs_more_training_data(spec, n_vectors):
+        print(f"Only {n_vectors} vectors: too few to train {spec}, using a flat index")
+        spec = "Flat"
+    index = faiss.index_factory(dim, spec)
+    if not index.is_trained:
+        index.train(vectors)
+    return index
+
+
+def set_search_params(index, nprobe=NPROBE, ef_search=EF_SEARCH):
+    params = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if hasattr(faiss.downcast_index(index), "hnsw"):
+        params.set_index_parameter(index, "efSearch", ef_search)
+    return index
+
+
+def build_store(texts, embeddings, metadatas=None, ids=None, kind=INDEX_FACTORY):
+    # like FAISS.from_texts, but with the configured index type
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    index = set_search_params(make_index(vectors, kind))
+    store = FAISS(embeddings, index, InMemoryDocstore(), {})
+    store.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas, ids=ids)
+    return store
+
+
+def rebuild_store(store, embeddings, ids=None, kind=INDEX_FACTORY):
+    # new store of the given chunks (all of them by default), with the index
+    # type sized and trained for the current corpus. The vectors are read
+    # through the embedding cache; chunks it has evicted (a corpus larger than
+    # cache_capacity) are sent to the embedding model again. None when no
+    # chunks are left
+    ids = chunk_ids(store) if ids is None else list(ids)
+    if not ids:
+        return None
+    docs = [store.docstore.search(i) for i in ids]
+    return build_store([d.page_content for d in docs], embeddings, metadatas=[d.metadata for d in docs],
+                       ids=ids, kind=kind)
+
+
+CURRENT_FILE = "CURRENT"  # names the live generation directory
+GENERATION_PREFIX = "gen-"
+LEGACY_FILES = ("index.faiss", "index.pkl", chunk_store.CHUNKS_FILE, chunk_store.OFFSETS_FILE,
+                chunk_store.IDS_FILE, chunk_store.ID_POS_FILE)  # saved straight into the folder
+
+
+def store_dir(folder):
+    # directory holding the live index.faiss and chunk files: the generation
+    # named in CURRENT, or the folder itself for an index saved before generations
+    try:
+        with open(os.path.join(folder, CURRENT_FILE)) as f:
+            return os.path.join(folder, f.read().strip())
+    except FileNotFoundError:
+        return folder
+
+
+def store_exists(folder):
+    return os.path.exists(os.path.join(store_dir(folder), "index.faiss"))
+
+
+def load_store(folder, embeddings, mmap=MMAP, lazy=False):
+    # lazy=True (query side) keeps the chunk store on disk and reads chunks by
+    # vector position on demand; lazy=False loads them for ingestion
+    folder = store_dir(folder)
+    path = os.path.join(folder, "index.faiss")
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0)
+    except RuntimeError:
+        # this faiss build cannot memory-map this index type
+        index = faiss.read_index(path)
+
+    if chunk_store.exists(folder):
+        store = chunk_store.ChunkStore(folder)
+        if lazy:
+            docstore, index_to_docstore_id = store, chunk_store.ChunkIdMap(store)
+        else:
+            docstore, index_to_docstore_id = store.load_all()
+    else:
+        # index written before the chunk store existed; converted on the next save
+        with open(os.path.join(folder, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, set_search_params(index), docstore, index_to_docstore_id)
+
+
+def save_store(store, folder):
+    # replaces FAISS.save_local: index.faiss plus the chunk store, no pickle,
+    # written to a new generation that CURRENT then points at
+    os.makedirs(folder, exist_ok=True)
+    generation = f"{GENERATION_PREFIX}{time.time_ns()}"
+    path = os.path.join(folder, generation)
+    os.makedirs(path)
+    faiss.write_index(store.index, os.path.join(path, "index.faiss"))
+    chunk_store.save(path, store.index_to_docstore_id, store.docstore)
+    tmp = os.path.join(folder, CURRENT_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(generation)
+    os.replace(tmp, os.path.join(folder, CURRENT_FILE))
+    remove_old_generations(folder)
+
+
+def remove_old_generations(folder):
+    # best effort: a file still open or mapped by a cached store cannot be
+    # deleted on Windows, and is retried on the next save
+    live = os.path.basename(store_dir(folder))
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.startswith(GENERATION_PREFIX) and name != live:
+            shutil.rmtree(path, ignore_errors=True)
+        elif name in LEGACY_FILES:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def chunk_ids(store):
+    # every chunk id in the store, without reading chunk text from a lazy store
+    if isinstance(store.docstore, chunk_store.ChunkStore):
+        return store.docstore.ids()
+    return list(store.index_to_docstore_id.values())
+
+
+def recall_at_k(found, truth, k):
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def benchmark(vectors, queries, k, kinds):
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    rows = []
+    for kind in kinds:
+        start = time.perf_counter()
+        index = set_search_params(make_index(vectors, kind))
+        index.add(vectors)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        search = time.perf_counter() - start
+        rows.append({"index": factory_string(kind, vectors.shape[1], len(vectors)), "build_s": round(build, 3),
+                     "ms_per_query": round(1000 * search / len(queries), 4),
+                     f"recall@{k}": round(recall_at_k(found, truth, k), 4),
+                     "bytes": int(faiss.serialize_index(index).size)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types against exact search")
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", default="flat,ivfpq,hnsw", help="comma separated index types or factory strings")
+    parser.add_argument("--index-dir", help="benchmark the vectors of an existing flat index instead of synthetic data")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index_dir:
+        index = faiss.read_index(os.path.join(store_dir(args.index_dir), "index.faiss"))
+        vectors = index.reconstruct_n(0, index.ntotal)
+    else:
+        # clustered synthetic data, closer to real embeddings than uniform noise
+        centers = rng.normal(size=(256, args.dim)).astype(np.float32)
+        vectors = centers[rng.integers(0, 256, args.vectors)] + 0.3 * rng.normal(size=(args.vectors, args.dim)).astype(np.float32)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    print(json.dumps(benchmark(vectors.astype(np.float32), queries.astype(np.float32), args.k, args.kinds.split(",")), indent=2))
+
+
+if __name__ == "__main__":
+    main()
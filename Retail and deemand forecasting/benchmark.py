@@ -0,0 +1,250 @@
+# Rolling-origin benchmark of the notebook's forecasting models.
+#
+# For a sample of series, each model is fit at several forecast origins
+# (the last `origins` non-overlapping `horizon`-day blocks) and scored on the
+# block that follows. Per model and fold it records fit time, predict time,
+# peak traced memory, RMSE and MAPE. Memory is measured in a second, traced
+# run (tracemalloc slows allocation-heavy fits, so it would skew the timings)
+# and covers Python and NumPy allocations, not TensorFlow's own allocator.
+# The JSON report aggregates them per series class and recommends a default
+# model per class: the cheapest model whose mean RMSE is within --tolerance of
+# the most accurate one.
+#
+# Usage:
+#   python benchmark.py --synthetic 40 -o benchmark.json                 # offline, generated data
+#   python benchmark.py --csv retail_store_inventory.csv --sample 50 --models naive,sarimax,prophet,lstm
+import json
+import time
+import argparse
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_daily_cached
+from forecast_utils import iter_series, fit_sarimax, naive_forecast, mape, rmse
+
+Prophet = None
+try:
+    from prophet import Prophet as _Prophet
+    Prophet = _Prophet
+except Exception:
+    pass
+
+DEFAULT_MODELS = "naive,sarimax,prophet,lstm"
+LSTM_EPOCHS = 10
+
+
+class NaiveModel:
+    def fit(self, series):
+        self.series = series
+
+    def predict(self, horizon):
+        return naive_forecast(self.series, horizon).to_numpy()
+
+
+class SarimaxModel:
+    def fit(self, series):
+        self.results = fit_sarimax(series)
+
+    def predict(self, horizon):
+        return self.results.get_forecast(steps=horizon).predicted_mean.to_numpy()
+
+
+class ProphetModel:
+    def fit(self, series):
+        self.model = Prophet(daily_seasonality=True, weekly_seasonality=True)
+        self.model.fit(series.reset_index().rename(columns={'date':'ds', series.name:'y'}))
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, freq='D')
+        return self.model.predict(future)['yhat'].iloc[-horizon:].to_numpy()
+
+
+class LSTMModel:
+    def __init__(self, horizon):
+        from lstm_forecaster import LSTMForecaster
+        self.forecaster = LSTMForecaster(horizon=horizon, epochs=LSTM_EPOCHS)
+
+    def fit(self, series):
+        self.values = series.to_numpy(dtype=np.float32)
+        self.forecaster.fit([self.values])
+
+    def predict(self, horizon):
+        return self.forecaster.predict([self.values])[0][:horizon]
+
+
+def available_models(names, horizon):
+    # name -> factory for the requested models that can run here
+    factories = {"naive": NaiveModel, "sarimax": SarimaxModel}
+    if Prophet is not None:
+        factories["prophet"] = ProphetModel
+    if "lstm" in names:
+        # importing lstm_forecaster imports TensorFlow, so only when asked for
+        try:
+            from lstm_forecaster import TF_AVAILABLE
+        except ImportError:
+            TF_AVAILABLE = False
+        if TF_AVAILABLE:
+            factories["lstm"] = lambda: LSTMModel(horizon)
+    skipped = [n for n in names if n not in factories]
+    if skipped:
+        print("Skipping unavailable models:", ", ".join(skipped))
+    return {n: factories[n] for n in names if n in factories}
+
+
+def series_class(values):
+    # coarse demand pattern used to pick a default model per class
+    values = np.asarray(values, dtype=float)
+    if len(values) < 365:
+        return "short"
+    if np.mean(values == 0) > 0.5:
+        return "intermittent"
+    mean = values.mean()
+    if mean and values.std() / mean > 1.0:
+        return "volatile"
+    return "smooth"
+
+
+def synthetic_daily(n_series=40, n_days=730, seed=0):
+    # df_daily-shaped data (sku, category, date, quantity) mixing smooth
+    # seasonal, trending, intermittent and volatile demand
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2022-01-01", periods=n_days, freq='D')
+    t = np.arange(n_days)
+    kinds = ["seasonal", "trend", "intermittent", "volatile"]
+    frames = []
+    for i in range(n_series):
+        kind = kinds[i % len(kinds)]
+        level = rng.uniform(20, 200)
+        weekly = 0.2 * level * np.sin(2 * np.pi * t / 7 + rng.uniform(0, 2 * np.pi))
+        yearly = 0.3 * level * np.sin(2 * np.pi * t / 365.25 + rng.uniform(0, 2 * np.pi))
+        if kind == "seasonal":
+            qty = level + weekly + yearly + rng.normal(0, 0.1 * level, n_days)
+        elif kind == "trend":
+            qty = level * (1 + t / n_days) + weekly + rng.normal(0, 0.1 * level, n_days)
+        elif kind == "intermittent":
+            qty = rng.poisson(level / 10, n_days) * (rng.random(n_days) < 0.3)
+        else:
+            qty = level * rng.lognormal(0, 1.0, n_days)
+        frames.append(pd.DataFrame({"sku": f"SYN{i:05d}", "category": kind, "date": dates,
+                                    "quantity": np.maximum(0, np.round(qty))}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def fit_predict(factory, train, horizon):
+    model = factory()
+    model.fit(train)
+    return model.predict(horizon)
+
+
+def backtest(series, models, horizon, origins, memory=True):
+    # one row per (model, origin) for this series
+    rows = []
+    for k in range(origins, 0, -1):
+        cut = len(series) - k * horizon
+        if cut < 2 * horizon:
+            continue
+        train, test = series.iloc[:cut], series.iloc[cut:cut + horizon].to_numpy()
+        for name, factory in models.items():
+            row = {"model": name, "origin": str(train.index[-1].date()), "train_days": len(train)}
+            try:
+                model = factory()
+                _, fit_s = timed(lambda: model.fit(train))
+                fc, predict_s = timed(lambda: model.predict(horizon))
+                peak = peak_memory_mb(lambda: fit_predict(factory, train, horizon)) if memory else None
+                row.update(fit_s=fit_s, predict_s=predict_s, peak_mb=peak,
+                           rmse=rmse(test, fc), mape=float(mape(test, fc)), error="")
+            except Exception as e:
+                row.update(fit_s=None, predict_s=None, peak_mb=None, rmse=None, mape=None,
+                           error=f"{type(e).__name__}: {e}")
+            rows.append(row)
+    return rows
+
+
+def summarize(rows, tolerance):
+    df = pd.DataFrame(rows)
+    ok = df[df["error"] == ""]
+    summary = ok.groupby(["series_class", "model"])[["rmse", "mape", "fit_s", "predict_s", "peak_mb"]].mean()
+    summary["failures"] = df.groupby(["series_class", "model"])["error"].apply(lambda e: int((e != "").sum()))
+    summary["cost_s"] = summary["fit_s"] + summary["predict_s"]
+    recommended = {}
+    for cls, group in summary.groupby(level=0):
+        group = group.droplevel(0)
+        good = group[group["rmse"] <= group["rmse"].min() * (1 + tolerance)]
+        if len(good):
+            recommended[cls] = good["cost_s"].idxmin()
+    return summary.reset_index(), recommended
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin benchmark of the forecasting models")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="retail_store_inventory.csv")
+    source.add_argument("--synthetic", type=int, metavar="N", help="benchmark N generated series instead")
+    parser.add_argument("--level", choices=("sku", "category"), default="sku")
+    parser.add_argument("--sample", type=int, default=20, help="series sampled from the CSV")
+    parser.add_argument("--models", default=DEFAULT_MODELS)
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--origins", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="RMSE slack when trading accuracy for cost")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    if args.synthetic:
+        df_daily, level = synthetic_daily(args.synthetic, seed=args.seed), "sku"
+    else:
+        df_daily, level = load_daily_cached(args.csv), args.level
+    keys = df_daily[level].unique()
+    if not args.synthetic and len(keys) > args.sample:
+        keys = np.random.default_rng(args.seed).choice(keys, args.sample, replace=False)
+    keys = set(keys)
+    models = available_models(args.models.split(","), args.horizon)
+
+    rows = []
+    start = time.perf_counter()
+    for key, sel in iter_series(df_daily, level):
+        if key not in keys:
+            continue
+        series = sel['quantity'].astype(float)
+        cls = series_class(series)
+        for row in backtest(series, models, args.horizon, args.origins, not args.no_memory):
+            rows.append({"series": str(key), "series_class": cls, **row})
+        print(f"{key} ({cls}) done")
+    if not rows:
+        # backtest needs two horizons of training data before the earliest origin
+        raise SystemExit(f"No backtest folds: no series has the {(args.origins + 2) * args.horizon} days needed "
+                         f"for {args.origins} origin(s) at --horizon {args.horizon} (at least {3 * args.horizon} "
+                         f"for one); lower --horizon or --origins")
+    summary, recommended = summarize(rows, args.tolerance)
+
+    report = {"config": vars(args), "models": list(models),
+              "seconds": round(time.perf_counter() - start, 2), "recommended": recommended,
+              "summary": summary.to_dict(orient="records"), "folds": rows}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(summary.to_string(index=False))
+    print("Recommended default per series class:", recommended)
+
+
+if __name__ == "__main__":
+    main()
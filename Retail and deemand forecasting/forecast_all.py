@@ -0,0 +1,231 @@
+# Forecast every SKU and category of the retail dataset in parallel.
+#
+# Each series is backtested (SARIMAX on the last `horizon` days, as in the
+# notebook) and then refit on its full history to forecast `horizon` days
+# ahead. Series are fanned out over a process pool; a fit that fails or runs
+# past --timeout seconds falls back to the naive last-7-days mean. Workers
+# interrupt their own fit with SIGALRM where it exists; in addition the parent
+# gives up on a series PARENT_GRACE seconds past the timeout, falls back to
+# the naive forecast and replaces the pool with the hung worker (the only
+# enforcement on Windows, which has no SIGALRM). Results go
+# into two consolidated tables in the output directory:
+#   forecasts.csv - level, series, model, step, date, forecast
+#   metrics.csv   - level, series, model, status, n_obs, rmse, mape, seconds, fit, error
+#
+# With --model-store, fitted parameters are kept per series and a nightly run
+# appends the new days or warm-starts instead of refitting (see model_store.py).
+#
+# Usage:
+#   python forecast_all.py retail_store_inventory.csv -o forecasts_invenai --workers 8 --timeout 60
+#   python forecast_all.py retail_store_inventory.csv --model-store models.sqlite --no-eval   # nightly refresh
+import os
+import time
+import signal
+import argparse
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_daily_cached
+from forecast_utils import (iter_series, train_test_split, train_sarimax, fit_sarimax,
+                            naive_forecast, future_index, HORIZON)
+from model_store import ModelStore, update_sarimax, MODES
+
+DEFAULT_TIMEOUT = 60  # seconds per series
+MIN_HISTORY = 30      # shorter series go straight to the naive forecast
+MAX_PENDING_PER_WORKER = 4
+PARENT_GRACE = 10     # seconds past --timeout before the parent abandons a worker
+
+
+class SeriesTimeout(BaseException):
+    # BaseException so the notebook's broad `except Exception` handlers do not swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise SeriesTimeout()
+
+
+def _init_worker():
+    warnings.filterwarnings("ignore")
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def to_series(values, start):
+    return pd.Series(values, index=pd.date_range(start, periods=len(values), freq='D'), name='quantity')
+
+
+def forecast_series(level, key, values, start, horizon=HORIZON, timeout=DEFAULT_TIMEOUT, evaluate=True,
+                    entry=None, store_mode=None):
+    # runs in a worker; returns (metrics row, forecast values, forecast start,
+    # model store entry or None)
+    series = to_series(values, start)
+    row = {"level": level, "series": key, "model": "sarimax", "status": "ok", "n_obs": len(series),
+           "rmse": None, "mape": None, "seconds": 0.0, "fit": "full", "error": ""}
+    new_entry = None
+    alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    begin = time.perf_counter()
+    try:
+        # SIGALRM interrupts the fit in this worker; platforms without it run unbounded
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            if len(series) < MIN_HISTORY:
+                raise ValueError(f"only {len(series)} days of history")
+            if evaluate:
+                train, test = train_test_split(series, horizon)
+                _, _, row["rmse"], row["mape"] = train_sarimax(train, test)
+            if store_mode:
+                results, new_entry = update_sarimax(series, entry, store_mode)
+                row["fit"] = new_entry["fit_kind"]
+            else:
+                results = fit_sarimax(series)
+            fc = results.get_forecast(steps=horizon).predicted_mean.to_numpy()
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        if not np.all(np.isfinite(fc)):
+            raise ValueError("non-finite forecast")
+    except SeriesTimeout:
+        new_entry = None
+        row.update(model="naive", status="timeout", rmse=None, mape=None, fit="none", error=f"no fit within {timeout}s")
+        fc = naive_forecast(series, horizon).to_numpy()
+    except Exception as e:
+        new_entry = None
+        row.update(model="naive", status="failed", rmse=None, mape=None, fit="none", error=f"{type(e).__name__}: {e}")
+        fc = naive_forecast(series, horizon).to_numpy()
+    row["seconds"] = round(time.perf_counter() - begin, 3)
+    return row, fc, future_index(series, 1)[0], new_entry
+
+
+def abandoned_result(level, key, values, start, horizon, timeout, seconds):
+    # the parent's fallback for a series whose worker stopped responding
+    series = to_series(values, start)
+    row = {"level": level, "series": key, "model": "naive", "status": "timeout", "n_obs": len(series),
+           "rmse": None, "mape": None, "seconds": round(seconds, 3), "fit": "none",
+           "error": f"no result after {timeout}s + {PARENT_GRACE}s grace, worker restarted"}
+    return row, naive_forecast(series, horizon).to_numpy(), future_index(series, 1)[0], None
+
+
+def _stop_pool(pool):
+    # a fit stuck in native code cannot be interrupted from outside its
+    # process, so the workers are terminated outright
+    if hasattr(pool, "terminate_workers"):  # Python 3.14+
+        pool.terminate_workers()
+        return
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def iter_tasks(df_daily, levels, limit=None):
+    for level in levels:
+        keys = None
+        if limit:
+            keys = set(df_daily.groupby(level, observed=True)['quantity'].sum().nlargest(limit).index)
+        for key, series in iter_series(df_daily, level):
+            if keys is None or key in keys:
+                yield level, key, series['quantity'].to_numpy(dtype=np.float64), series.index[0]
+
+
+def run_all(df_daily, levels=("sku", "category"), horizon=HORIZON, workers=None, timeout=DEFAULT_TIMEOUT,
+            evaluate=True, limit=None, store=None, store_mode="auto"):
+    # (metrics DataFrame, forecasts DataFrame) for every series at the given levels
+    workers = workers or os.cpu_count() or 1
+    if timeout and not hasattr(signal, "SIGALRM"):
+        print(f"No SIGALRM on this platform: a fit running past {timeout}s is only stopped after "
+              f"{PARENT_GRACE}s more, by restarting the worker pool")
+    metrics, forecasts = [], []
+    entries = {level: store.entries(level) for level in levels} if store else {}
+    updated = {level: [] for level in levels}
+
+    def record(result):
+        row, fc, start, entry = result
+        metrics.append(row)
+        if entry is not None:
+            updated[row["level"]].append((row["series"], entry))
+        forecasts.append(pd.DataFrame({"level": row["level"], "series": row["series"], "model": row["model"],
+                                       "step": np.arange(1, len(fc) + 1),
+                                       "date": pd.date_range(start, periods=len(fc), freq='D'), "forecast": fc}))
+        done = len(metrics)
+        if done % 100 == 0:
+            print(f"{done} series done")
+
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker)
+    # only a bounded number of series is queued, so memory does not grow with the catalog
+    pending = deque()  # (future, task arguments)
+
+    def collect():
+        # results in submission order; the wait starts when a series reaches
+        # the head of the queue, by which time it has normally been started
+        nonlocal pool
+        future, task = pending.popleft()
+        begin = time.perf_counter()
+        try:
+            record(future.result(timeout=timeout + PARENT_GRACE if timeout else None))
+            return
+        except FutureTimeout:
+            record(abandoned_result(*task[:5], timeout, time.perf_counter() - begin))
+        _stop_pool(pool)
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker)
+        # series that finished before the restart keep their result, the rest run again
+        for i, (future, task) in enumerate(pending):
+            if not (future.done() and not future.cancelled() and future.exception() is None):
+                pending[i] = (pool.submit(forecast_series, *task), task)
+
+    try:
+        for level, key, values, start in iter_tasks(df_daily, levels, limit):
+            entry = entries[level].get(str(key)) if store else None
+            task = (level, key, values, start, horizon, timeout, evaluate, entry, store_mode if store else None)
+            pending.append((pool.submit(forecast_series, *task), task))
+            if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                collect()
+        while pending:
+            collect()
+    finally:
+        pool.shutdown()
+
+    if store:
+        for level, level_entries in updated.items():
+            store.put_many(level, level_entries)
+    metrics = pd.DataFrame(metrics)
+    forecasts = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame()
+    return metrics, forecasts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast every SKU and category in parallel")
+    parser.add_argument("csv", help="retail_store_inventory.csv")
+    parser.add_argument("-o", "--out-dir", default="forecasts_invenai")
+    parser.add_argument("--levels", default="sku,category", help="comma separated: sku, category")
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per series, 0 for none")
+    parser.add_argument("--no-eval", action="store_true", help="skip the holdout backtest (one fit per series)")
+    parser.add_argument("--limit", type=int, help="only the N largest series per level")
+    parser.add_argument("--model-store", help="SQLite file of fitted SARIMAX parameters to reuse and update")
+    parser.add_argument("--store-mode", choices=MODES, default="auto",
+                        help="auto: append new days, warm-start once the parameters are stale")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df_daily = load_daily_cached(args.csv)
+    store = ModelStore(args.model_store) if args.model_store else None
+    metrics, forecasts = run_all(df_daily, args.levels.split(","), args.horizon, args.workers, args.timeout,
+                                 not args.no_eval, args.limit, store, args.store_mode)
+    if store:
+        store.close()
+    os.makedirs(args.out_dir, exist_ok=True)
+    metrics.to_csv(os.path.join(args.out_dir, "metrics.csv"), index=False)
+    forecasts.to_csv(os.path.join(args.out_dir, "forecasts.csv"), index=False)
+    print(metrics.groupby(["level", "status", "fit"]).size().to_string())
+    print(f"{len(metrics)} series in {time.perf_counter() - start:.1f}s -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
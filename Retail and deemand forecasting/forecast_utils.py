@@ -0,0 +1,116 @@
+# Reusable pieces of retail-and-demand-foorecasting.ipynb: dataset loading,
+# column detection, per-SKU / per-category daily series, SARIMAX and the
+# naive fallback, so they can run outside the notebook (see forecast_all.py).
+import warnings
+from math import sqrt
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+SARIMAX_ORDER = (1, 1, 1)
+SEASONAL_ORDER = (1, 1, 1, 7)
+HORIZON = 90
+NAIVE_WINDOW = 7  # days averaged by the naive forecast
+
+
+def mape(y_true, y_pred):
+    y_true, y_pred = np.array(y_true), np.array(y_pred)
+    denom = np.where(y_true == 0, 1e-8, y_true)
+    return np.mean(np.abs((y_true - y_pred) / denom)) * 100
+
+
+def rmse(y_true, y_pred):
+    return sqrt(np.mean((np.asarray(y_true, dtype=float) - np.asarray(y_pred, dtype=float)) ** 2))
+
+
+def detect_columns(df):
+    date_candidates = [c for c in df.columns if 'date' in c.lower() or 'time' in c.lower() or 'day' in c.lower()]
+    date_col = date_candidates[0] if date_candidates else None
+    sku_candidates = [c for c in df.columns if any(k in c.lower() for k in ['sku','product','item','id'])]
+    sku_col = sku_candidates[0] if sku_candidates else None
+    qty_candidates = [c for c in df.columns if any(k in c.lower() for k in ['qty','quantity','sales','units','demand'])]
+    qty_col = qty_candidates[0] if qty_candidates else None
+    cat_candidates = [c for c in df.columns if any(k in c.lower() for k in ['category','cat','department','segment'])]
+    cat_col = cat_candidates[0] if cat_candidates else None
+    return date_col, sku_col, qty_col, cat_col
+
+
+def daily_aggregate(df):
+    # raw rows -> df_daily with columns sku, category, date, quantity
+    date_col, sku_col, qty_col, cat_col = detect_columns(df)
+    if date_col is None or qty_col is None:
+        raise ValueError(f"Date or quantity column not found in {df.columns.tolist()}")
+    df = df.copy()
+    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+    df = df.dropna(subset=[date_col])
+    if sku_col is None:
+        df['__sku'] = 'ALL_SKU'; sku_col = '__sku'
+    if cat_col is None:
+        df['__category'] = 'ALL_CAT'; cat_col = '__category'
+    df[qty_col] = pd.to_numeric(df[qty_col], errors='coerce').fillna(0)
+    df_daily = df.groupby([sku_col, cat_col, pd.Grouper(key=date_col, freq='D')])[qty_col].sum().reset_index()
+    return df_daily.rename(columns={date_col:'date', qty_col:'quantity', sku_col:'sku', cat_col:'category'})
+
+
+def load_daily(path):
+    return daily_aggregate(pd.read_csv(path))
+
+
+def get_series(df_daily, level, value, freq='D'):
+    if level=='sku':
+        sel = df_daily[df_daily['sku']==value][['date','quantity']].set_index('date').sort_index()
+    else:
+        sel = df_daily[df_daily['category']==value][['date','quantity']].set_index('date').sort_index()
+    sel = sel.resample(freq).sum().fillna(0); sel.index.name='date'
+    return sel
+
+
+def iter_series(df_daily, level, freq='D'):
+    # (value, series) for every SKU or category, like get_series but with one
+    # groupby pass instead of a full-table filter per series
+    for value, group in df_daily.groupby(level, observed=True, sort=False):
+        sel = group.groupby('date')['quantity'].sum().sort_index().to_frame()
+        sel = sel.resample(freq).sum().fillna(0); sel.index.name='date'
+        yield value, sel
+
+
+def train_test_split(series, horizon=HORIZON):
+    if len(series) > (horizon + 30):
+        return series.iloc[:-horizon], series.iloc[-horizon:]
+    split = int(len(series)*0.8)
+    return series.iloc[:split], series.iloc[split:]
+
+
+def future_index(series, steps):
+    return pd.date_range(start=series.index[-1]+pd.Timedelta(days=1), periods=steps, freq='D')
+
+
+def make_sarimax(series):
+    return SARIMAX(series, order=SARIMAX_ORDER, seasonal_order=SEASONAL_ORDER,
+                   enforce_stationarity=False, enforce_invertibility=False)
+
+
+def fit_sarimax(train_series, **fit_kw):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return make_sarimax(train_series).fit(disp=False, **fit_kw)
+
+
+def train_sarimax(train_series, test_series):
+    try:
+        fit = fit_sarimax(train_series)
+        steps = len(test_series)
+        pred = fit.get_forecast(steps=steps)
+        fc = pred.predicted_mean
+        fc.index = test_series.index[:len(fc)]
+        rmse_val = rmse(test_series.iloc[:len(fc)], fc)
+        mape_val = mape(test_series.iloc[:len(fc)], fc)
+        return fit, fc, rmse_val, mape_val
+    except Exception as e:
+        print("SARIMAX error:", e)
+        return None, None, None, None
+
+
+def naive_forecast(series, steps):
+    return pd.Series([series.tail(NAIVE_WINDOW).mean()]*steps, index=future_index(series, steps))
@@ -0,0 +1,124 @@
+# Chunked ingestion of the retail CSV into a cached, partitioned Parquet copy
+# of df_daily (sku, category, date, quantity).
+#
+# Only the four detected columns are read, CHUNK_ROWS rows at a time, and each
+# chunk is reduced to daily sums before the next one is read, so memory is
+# bounded by the size of the daily aggregate rather than the raw file. SKU and
+# category are stored as categoricals and quantity is downcast. The Parquet
+# dataset (partitioned by category) is rebuilt only when the source file's
+# size or modification time changes.
+#
+# Usage:
+#   python ingest.py retail_store_inventory.csv            # build / refresh the cache
+#   from ingest import load_daily_cached; df_daily = load_daily_cached(path)
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from forecast_utils import detect_columns
+
+CHUNK_ROWS = 1_000_000
+CACHE_ROOT = os.getenv("RETAIL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".daily_cache"))
+MANIFEST = "_source.json"  # leading underscore: skipped by Parquet readers
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_dir_for(path, root=CACHE_ROOT):
+    return os.path.join(root, os.path.splitext(os.path.basename(path))[0] + ".parquet")
+
+
+def compact(df_daily):
+    df_daily['sku'] = df_daily['sku'].astype('category')
+    df_daily['category'] = df_daily['category'].astype('category')
+    qty = df_daily['quantity']
+    if np.all(np.mod(qty, 1) == 0):
+        df_daily['quantity'] = pd.to_numeric(qty, downcast='integer')
+    else:
+        df_daily['quantity'] = qty.astype(np.float32)
+    return df_daily
+
+
+def aggregate_csv(path, chunk_rows=CHUNK_ROWS):
+    # df_daily from the CSV, streamed chunk by chunk
+    columns = pd.read_csv(path, nrows=0).columns
+    date_col, sku_col, qty_col, cat_col = detect_columns(pd.DataFrame(columns=columns))
+    if date_col is None or qty_col is None:
+        raise ValueError(f"Date or quantity column not found in {columns.tolist()}")
+    usecols = [c for c in (date_col, sku_col, qty_col, cat_col) if c is not None]
+    dtype = {c: str for c in (sku_col, cat_col) if c is not None}
+
+    partials = []
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunk_rows):
+        chunk[date_col] = pd.to_datetime(chunk[date_col], errors='coerce').dt.normalize()
+        chunk = chunk.dropna(subset=[date_col])
+        chunk[qty_col] = pd.to_numeric(chunk[qty_col], errors='coerce').fillna(0)
+        chunk = chunk.rename(columns={date_col:'date', qty_col:'quantity', sku_col:'sku', cat_col:'category'})
+        if sku_col is None:
+            chunk['sku'] = 'ALL_SKU'
+        if cat_col is None:
+            chunk['category'] = 'ALL_CAT'
+        partials.append(chunk.groupby(['sku', 'category', 'date'], sort=False)['quantity'].sum())
+    # a day can be split across two chunks, so the partial sums are summed again
+    daily = pd.concat(partials).groupby(level=[0, 1, 2]).sum().reset_index() if partials else \
+        pd.DataFrame(columns=['sku', 'category', 'date', 'quantity'])
+    return compact(daily)
+
+
+def build_cache(path, cache_dir=None, chunk_rows=CHUNK_ROWS):
+    cache_dir = cache_dir or cache_dir_for(path)
+    df_daily = aggregate_csv(path, chunk_rows)
+    tmp = cache_dir + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    df_daily.to_parquet(tmp, partition_cols=['category'], index=False)
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump(source_signature(path), f)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp, cache_dir)
+    return df_daily
+
+
+def is_fresh(path, cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            return json.load(f) == source_signature(path)
+    except (OSError, ValueError):
+        return False
+
+
+def load_daily_cached(path, cache_dir=None, rebuild=False):
+    # df_daily for this CSV, from the Parquet cache when it is up to date
+    cache_dir = cache_dir or cache_dir_for(path)
+    if rebuild or not is_fresh(path, cache_dir):
+        return build_cache(path, cache_dir)
+    df_daily = pd.read_parquet(cache_dir)
+    df_daily['category'] = df_daily['category'].astype(str).astype('category')
+    return df_daily[['sku', 'category', 'date', 'quantity']].sort_values(['sku', 'category', 'date'], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Parquet cache of the daily retail aggregate")
+    parser.add_argument("csv")
+    parser.add_argument("--cache-dir", help=f"default: {CACHE_ROOT}/<csv name>.parquet")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or cache_dir_for(args.csv)
+    fresh = not args.rebuild and is_fresh(args.csv, cache_dir)
+    start = time.perf_counter()
+    df_daily = load_daily_cached(args.csv, cache_dir) if fresh else build_cache(args.csv, cache_dir, args.chunk_rows)
+    print(f"{'loaded' if fresh else 'built'} {len(df_daily)} daily rows in {time.perf_counter() - start:.2f}s "
+          f"({df_daily.memory_usage(deep=True).sum() / 2**20:.1f} MiB) -> {cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Direct multi-horizon LSTM forecaster for many series at once.
+#
+# Replaces the notebook's LSTM block, which built windows in a Python loop,
+# trained one model per series and forecast recursively with one
+# model.predict call per day. Here:
+#   - windows are strided NumPy views (sliding_window_view), no Python loop,
+#     and training batches are gathered from those views one batch at a time,
+#     so the full window matrix is never materialized
+#   - one model is trained on the windows of all series, each min-max scaled
+#     on its own history
+#   - the Dense head outputs the whole horizon, so forecasting every series
+#     is a single batched forward pass and errors do not compound per step
+#
+# Usage (holdout evaluation on the last `horizon` days of every SKU):
+#   python lstm_forecaster.py retail_store_inventory.csv --level sku --horizon 90 -o lstm_metrics.csv
+import math
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ingest import load_daily_cached
+from forecast_utils import iter_series, mape, rmse, HORIZON
+
+TF_AVAILABLE = True
+try:
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
+    from tensorflow.keras.callbacks import EarlyStopping
+except Exception:
+    TF_AVAILABLE = False
+
+N_INPUT = 14
+
+
+def make_windows(values, n_input=N_INPUT, horizon=HORIZON, stride=1):
+    # (X, Y) views of shape (n, n_input) and (n, horizon): every `stride`-th
+    # input window and the horizon that follows it
+    values = np.asarray(values, dtype=np.float32)
+    if len(values) < n_input + horizon:
+        return np.empty((0, n_input), np.float32), np.empty((0, horizon), np.float32)
+    windows = sliding_window_view(values, n_input + horizon)[::stride]
+    return windows[:, :n_input], windows[:, n_input:]
+
+
+def scale_params(values):
+    # per-series min-max scaling, as MinMaxScaler in the notebook
+    lo, hi = float(np.min(values)), float(np.max(values))
+    return lo, (hi - lo) or 1.0
+
+
+def last_window(values, n_input=N_INPUT):
+    # left-padded with the first value when the history is shorter than n_input
+    values = np.asarray(values, dtype=np.float32)[-n_input:]
+    return np.pad(values, (n_input - len(values), 0), mode="edge")
+
+
+class WindowBatches(tf.keras.utils.Sequence if TF_AVAILABLE else object):
+    # shuffled training batches copied out of per-series (X, Y) window views;
+    # memory is one batch of windows, not every window of every series
+
+    def __init__(self, views, batch_size, seed=42):
+        super().__init__()
+        self.views = views
+        self.offsets = np.cumsum([0] + [len(X) for X, _ in views])  # first global window of each series
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(self.offsets[-1] / self.batch_size)
+
+    def __getitem__(self, i):
+        idx = np.sort(self.order[i * self.batch_size:(i + 1) * self.batch_size])
+        series = np.searchsorted(self.offsets, idx, side='right') - 1
+        local = idx - self.offsets[series]
+        X = np.stack([self.views[s][0][j] for s, j in zip(series, local)])
+        Y = np.stack([self.views[s][1][j] for s, j in zip(series, local)])
+        return X[..., None], Y
+
+    def on_epoch_end(self):
+        self.order = self.rng.permutation(self.offsets[-1])
+
+
+class LSTMForecaster:
+    def __init__(self, n_input=N_INPUT, horizon=HORIZON, units=32, dropout=0.2, epochs=30, batch_size=256,
+                 patience=5, stride=1, seed=42):
+        if not TF_AVAILABLE:
+            raise ImportError("TensorFlow/Keras not installed. Install with: pip install -U tensorflow")
+        self.n_input = n_input
+        self.horizon = horizon
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.patience = patience
+        self.stride = stride
+        self.seed = seed
+        tf.keras.utils.set_random_seed(seed)
+        self.model = Sequential([Input((n_input, 1)), LSTM(units), Dropout(dropout), Dense(horizon)])
+        self.model.compile(optimizer='adam', loss='mse')
+        self.timings = {}
+
+    def fit(self, series_list):
+        # series_list: 1-D arrays of daily quantities, one per SKU / category
+        start = time.perf_counter()
+        views = []
+        for values in series_list:
+            if len(values) < self.n_input + self.horizon:
+                continue
+            lo, span = scale_params(values)
+            views.append(make_windows((np.asarray(values, dtype=np.float32) - lo) / span, self.n_input, self.horizon, self.stride))
+        if not views:
+            raise ValueError(f"no series has the {self.n_input + self.horizon} days needed for one training window")
+        batches = WindowBatches(views, self.batch_size, self.seed)
+        self.timings["windowing_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        es = EarlyStopping(monitor='loss', patience=self.patience, restore_best_weights=True)
+        self.model.fit(batches, epochs=self.epochs, callbacks=[es], verbose=0)
+        self.timings["train_s"] = time.perf_counter() - start
+        self.timings["train_windows"] = int(batches.offsets[-1])
+        self.timings["train_series"] = len(views)
+        # series skipped for a short history took no training time
+        self.timings["train_s_per_series"] = self.timings["train_s"] / len(views)
+        return self
+
+    def predict(self, series_list):
+        # (n_series, horizon) forecasts from the end of each history, in one forward pass
+        start = time.perf_counter()
+        params = [scale_params(values) for values in series_list]
+        X = np.stack([(last_window(values, self.n_input) - lo) / span for values, (lo, span) in zip(series_list, params)])
+        scaled = self.model.predict(X[..., None], batch_size=self.batch_size, verbose=0)
+        lo, span = np.array(params, dtype=np.float32).T
+        forecasts = scaled * span[:, None] + lo[:, None]
+        self.timings["predict_s"] = time.perf_counter() - start
+        self.timings["predict_ms_per_series"] = 1000 * self.timings["predict_s"] / len(series_list)
+        return forecasts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train one direct multi-horizon LSTM across many series")
+    parser.add_argument("csv", help="retail_store_inventory.csv")
+    parser.add_argument("--level", choices=("sku", "category"), default="sku")
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--n-input", type=int, default=N_INPUT)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--stride", type=int, default=1, help="take every n-th training window")
+    parser.add_argument("--limit", type=int, help="only the first N series")
+    parser.add_argument("-o", "--output", default="lstm_metrics.csv")
+    args = parser.parse_args()
+
+    keys, series = [], []
+    for key, sel in iter_series(load_daily_cached(args.csv), args.level):
+        if len(sel) <= args.horizon:
+            print(f"Skipping {key}: {len(sel)} days is not more than the horizon")
+            continue
+        keys.append(key)
+        series.append(sel['quantity'].to_numpy(dtype=np.float32))
+        if args.limit and len(keys) >= args.limit:
+            break
+    train = [values[:-args.horizon] for values in series]
+    forecaster = LSTMForecaster(args.n_input, args.horizon, epochs=args.epochs, stride=args.stride).fit(train)
+    forecasts = forecaster.predict(train)
+
+    rows = []
+    for key, values, fc in zip(keys, series, forecasts):
+        test = values[-args.horizon:]
+        rows.append({"series": key, "n_obs": len(values), "rmse": rmse(test, fc[:len(test)]), "mape": mape(test, fc[:len(test)]),
+                     "train_s_per_series": forecaster.timings["train_s_per_series"],
+                     "predict_ms_per_series": forecaster.timings["predict_ms_per_series"]})
+    pd.DataFrame(rows).to_csv(args.output, index=False)
+    t = forecaster.timings
+    print(f"{len(keys)} series, {t['train_windows']} windows: windowing {t['windowing_s']:.2f}s, "
+          f"training {t['train_s']:.1f}s, forecast {t['predict_s']:.2f}s "
+          f"({t['predict_ms_per_series']:.3f} ms/series) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Persistent SARIMAX parameters per series, for incremental forecast refresh.
+#
+# Only the fitted parameter vector and bookkeeping are stored (a pickled
+# SARIMAX results object is tens of MB). When new daily data arrives a series
+# is updated in one of three ways:
+#   append - stored parameters, Kalman filter over the last STATE_WINDOW days
+#            only: no optimization, cost independent of history length
+#   warm   - re-estimate starting from the stored parameters, capped at
+#            WARM_MAXITER iterations; done once REFIT_AFTER_DAYS new days
+#            have been appended since the last estimate
+#   full   - fit from scratch: new series, changed model spec, or a history
+#            that no longer extends the stored one
+import json
+import time
+import sqlite3
+import warnings
+
+import pandas as pd
+
+from forecast_utils import make_sarimax, fit_sarimax, SARIMAX_ORDER, SEASONAL_ORDER
+
+SPEC = f"SARIMAX{SARIMAX_ORDER}x{SEASONAL_ORDER}"
+STATE_WINDOW = 365     # days filtered when appending with fixed parameters
+REFIT_AFTER_DAYS = 28  # appended days before the parameters are re-estimated
+WARM_MAXITER = 50
+MODES = ("auto", "append", "warm", "full")
+
+
+class ModelStore:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS models (level TEXT, series TEXT, spec TEXT, params TEXT,
+                            last_date TEXT, n_obs INTEGER, days_since_fit INTEGER, fit_kind TEXT, updated REAL,
+                            PRIMARY KEY (level, series))""")
+        self._db.commit()
+
+    def entries(self, level):
+        # series -> stored entry, for every series of this level
+        rows = self._db.execute("SELECT series, spec, params, last_date, n_obs, days_since_fit, fit_kind FROM models "
+                                "WHERE level = ?", (level,))
+        return {series: {"spec": spec, "params": json.loads(params), "last_date": last_date, "n_obs": n_obs,
+                         "days_since_fit": days, "fit_kind": kind}
+                for series, spec, params, last_date, n_obs, days, kind in rows}
+
+    def put_many(self, level, entries):
+        # entries: (series, entry) pairs
+        now = time.time()
+        self._db.executemany("INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(level, str(series), e["spec"], json.dumps(e["params"]), e["last_date"], e["n_obs"],
+                               e["days_since_fit"], e["fit_kind"], now) for series, e in entries])
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def update_sarimax(series, entry=None, mode="auto"):
+    # (fitted results, new store entry) for `series`, reusing `entry` if possible
+    last = series.index[-1]
+    usable = (entry is not None and entry["spec"] == SPEC and mode != "full"
+              and pd.Timestamp(entry["last_date"]) <= last)
+    if not usable:
+        kind, results, days = "full", fit_sarimax(series), 0
+    else:
+        days = entry["days_since_fit"] + (last - pd.Timestamp(entry["last_date"])).days
+        if mode == "append" or (mode == "auto" and days < REFIT_AFTER_DAYS):
+            kind = "append"
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                results = make_sarimax(series.iloc[-STATE_WINDOW:]).filter(entry["params"])
+        else:
+            kind, results, days = "warm", fit_sarimax(series, start_params=entry["params"], maxiter=WARM_MAXITER), 0
+    new_entry = {"spec": SPEC, "params": [float(p) for p in results.params], "last_date": last.strftime("%Y-%m-%d"),
+                 "n_obs": len(series), "days_since_fit": days, "fit_kind": kind}
+    return results, new_entry
@@ -0,0 +1 @@
+# Helpers shared by the PDF / RAG apps in this repository.
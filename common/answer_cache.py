@@ -0,0 +1,74 @@
+# Semantic answer cache for the RAG apps.
+#
+# Answers are stored under the question's embedding and the version of the
+# index they were generated from. A new question whose embedding is within
+# `threshold` cosine similarity of a stored one (for the same index version)
+# gets the stored answer back. Entries expire after `ttl` seconds, the least
+# recently used ones are dropped past `max_entries`, and everything is
+# invalidated as soon as a different index version is seen.
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold=0.95, ttl=24 * 3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id -> (unit vector, question, answer, created)
+        self._next_id = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _sync(self, index_version):
+        # caller holds the lock
+        if index_version != self._version:
+            self._entries.clear()
+            self._version = index_version
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in self._entries.items() if e[3] < cutoff]:
+            del self._entries[key]
+
+    def lookup(self, vector, index_version):
+        with self._lock:
+            self._sync(index_version)
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                scores = matrix @ self._unit(vector)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def store(self, vector, index_version, question, answer):
+        with self._lock:
+            self._sync(index_version)
+            self._entries[self._next_id] = (self._unit(vector), question, answer, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
@@ -0,0 +1,106 @@
+# Page-aware, token-budgeted chunker for streamed PDF pages.
+#
+# Consumes PageRecords from common.pdf_extract and yields Chunks of at most
+# max_tokens model tokens, split on paragraph / sentence boundaries with a
+# token overlap between neighbours. A chunk never spans two files; it may run
+# over consecutive pages of one file, and records its first and last page.
+# Every unit of text is tokenized once, so the whole pass is linear in the
+# input size.
+import re
+from collections import deque, namedtuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+Chunk = namedtuple("Chunk", ["source", "doc", "page", "page_end", "text", "tokens"])
+
+# paragraph breaks and sentence ends (CJK full stops need no following space)
+UNIT_SPLIT_RE = re.compile(r"\n\s*\n|(?<=[.!?])\s+|(?<=[\u3002\uff01\uff1f])\s*")
+# without a tokenizer: roughly one token per 4 letters of a word, one per symbol
+APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def token_counter(encoding="cl100k_base"):
+    if tiktoken is not None:
+        enc = tiktoken.get_encoding(encoding)
+        return lambda text: len(enc.encode_ordinary(text))
+    return lambda text: len(APPROX_TOKEN_RE.findall(text))
+
+
+def _split_word(word, max_tokens, count_tokens):
+    # (text, tokens) pieces of one over-budget word (a URL, base64, a run of
+    # CJK text), cut by characters; piece sizes start from the word's average
+    # characters per token and shrink until a piece fits
+    chars_per_token = len(word) / max(1, count_tokens(word))
+    while word:
+        size = max(1, int(max_tokens * chars_per_token))
+        tokens = count_tokens(word[:size])
+        while tokens > max_tokens and size > 1:
+            size = max(1, min(size - 1, size * max_tokens // tokens))
+            tokens = count_tokens(word[:size])
+        yield word[:size], tokens
+        word = word[size:]
+
+
+def _units(text, max_tokens, count_tokens):
+    # (text, tokens) for each sentence / paragraph; longer ones are cut on
+    # words, and single words over budget on characters
+    for unit in UNIT_SPLIT_RE.split(text):
+        unit = " ".join(unit.split())
+        if not unit:
+            continue
+        tokens = count_tokens(unit)
+        if tokens <= max_tokens:
+            yield unit, tokens
+            continue
+        words, used = [], 0
+        for word in unit.split(" "):
+            cost = count_tokens(word)
+            if cost > max_tokens:
+                if words:
+                    yield " ".join(words), used
+                    words, used = [], 0
+                yield from _split_word(word, max_tokens, count_tokens)
+                continue
+            if words and used + cost > max_tokens:
+                yield " ".join(words), used
+                words, used = [], 0
+            words.append(word)
+            used += cost
+        if words:
+            yield " ".join(words), used
+
+
+def chunk_pages(pages, max_tokens=500, overlap_tokens=50, count_tokens=None):
+    count_tokens = count_tokens or token_counter()
+    window = deque()  # (text, tokens, page) of the chunk being built
+    used = 0
+    fresh = False  # window holds text not yet emitted in a chunk
+    current = None  # (doc, source) of the window
+
+    def emit():
+        text = " ".join(u[0] for u in window)
+        return Chunk(current[1], current[0], window[0][2], window[-1][2], text, used)
+
+    for record in pages:
+        if (record.doc, record.source) != current:
+            if fresh:
+                yield emit()
+            window.clear()
+            used, fresh, current = 0, False, (record.doc, record.source)
+        for unit, tokens in _units(record.text or "", max_tokens, count_tokens):
+            if used + tokens > max_tokens and fresh:
+                yield emit()
+                # keep a tail of the emitted chunk as overlap for the next one
+                while window and (used > overlap_tokens or used + tokens > max_tokens):
+                    used -= window.popleft()[1]
+                fresh = False
+            while window and used + tokens > max_tokens:
+                used -= window.popleft()[1]
+            window.append((unit, tokens, record.page))
+            used += tokens
+            fresh = True
+    if fresh:
+        yield emit()
@@ -0,0 +1,147 @@
+# Content-addressed, on-disk embedding cache shared by the RAG apps.
+#
+# Layout per embedding model (under EMBEDDING_CACHE_DIR/<model>/):
+#   index.sqlite - chunk-text hash -> row slot + last-used time
+#   vectors.f32  - memory-mapped float32 matrix, one row per slot
+# The matrix has a fixed number of slots; when it is full the least recently
+# used entries are evicted and their slots reused. Opening the cache with a
+# larger max_entries grows the matrix; it never shrinks.
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".embedding_cache"),
+)
+DEFAULT_MAX_ENTRIES = 100_000
+SQL_BATCH = 500
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, model, root=EMBEDDING_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.model = model
+        self.dir = os.path.join(root, re.sub(r"[^\w.-]", "_", model))
+        os.makedirs(self.dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+        self._db.commit()
+
+        # dimension is fixed once the matrix file exists; capacity only grows
+        meta = dict(self._db.execute("SELECT name, value FROM meta"))
+        self.max_entries = max(meta.get("max_entries", 0), max_entries)
+        if "dim" in meta and self.max_entries > meta.get("max_entries", 0):
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", ("max_entries", self.max_entries))
+            self._db.commit()
+        self._vectors = self._open_vectors(meta["dim"]) if "dim" in meta else None
+
+    def _open_vectors(self, dim):
+        path = os.path.join(self.dir, "vectors.f32")
+        mode = "r+" if os.path.exists(path) else "w+"
+        if mode == "r+" and os.path.getsize(path) < self.max_entries * dim * 4:
+            # grown capacity: extend the file, new slots read as zeros until used
+            os.truncate(path, self.max_entries * dim * 4)
+        return np.memmap(path, dtype=np.float32, mode=mode, shape=(self.max_entries, dim))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get_many(self, texts):
+        # returns one float32 vector (or None on a miss) per input text
+        keys = [text_key(t) for t in texts]
+        with self._lock:
+            slots = {}
+            if self._vectors is not None:
+                for i in range(0, len(keys), SQL_BATCH):
+                    batch = keys[i:i + SQL_BATCH]
+                    marks = ",".join("?" * len(batch))
+                    slots.update(self._db.execute(f"SELECT key, slot FROM entries WHERE key IN ({marks})", batch))
+                now = time.time()
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, k) for k in slots])
+                self._db.commit()
+            result = [np.array(self._vectors[slots[k]]) if k in slots else None for k in keys]
+        hits = sum(v is not None for v in result)
+        self.hits += hits
+        self.misses += len(result) - hits
+        return result
+
+    def put_many(self, texts, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        new = {}
+        for text, vector in zip(texts, vectors):
+            new.setdefault(text_key(text), vector)
+        if not new:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                     [("dim", vectors.shape[1]), ("max_entries", self.max_entries)])
+                self._vectors = self._open_vectors(vectors.shape[1])
+
+            known = {k for k in new if self._db.execute("SELECT 1 FROM entries WHERE key = ?", (k,)).fetchone()}
+            keys = [k for k in new if k not in known][:self.max_entries]
+            if not keys:
+                return
+
+            # fill free slots first, then recycle the least recently used ones
+            used = len(self)
+            slots = list(range(used, min(used + len(keys), self.max_entries)))
+            evict = len(keys) - len(slots)
+            if evict:
+                victims = self._db.execute("SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (evict,)).fetchall()
+                self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+                slots += [slot for _, slot in victims]
+
+            self._vectors[slots] = np.stack([new[k] for k in keys])
+            self._vectors.flush()
+            now = time.time()
+            self._db.executemany("INSERT INTO entries VALUES (?, ?, ?)", [(k, s, now) for k, s in zip(keys, slots)])
+            self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+class CachedEmbeddings(Embeddings):
+    # Drop-in LangChain Embeddings that reads documents through an EmbeddingCache.
+    # Queries are passed straight to the wrapped model.
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # identical chunks are only sent to the model once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = dict(zip(unique, self.embeddings.embed_documents(unique)))
+            self.cache.put_many(unique, [fresh[t] for t in unique])
+            for i in missing:
+                vectors[i] = fresh[texts[i]]
+        return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+def cached_embeddings(embeddings, model, **kwargs):
+    return CachedEmbeddings(embeddings, EmbeddingCache(model, **kwargs))
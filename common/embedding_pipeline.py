@@ -0,0 +1,149 @@
+# Batched, concurrent embedding stage with rate-limit-aware backpressure.
+#
+# EmbeddingPipeline wraps any object with an embed_documents(texts) method
+# (a LangChain embeddings model or the offline LocalHashEmbeddings below),
+# splits the input into batches and keeps up to max_in_flight batches running
+# at once. Quota errors back off exponentially and pause every worker until
+# the cooldown has passed, so a throttled API is not hammered by the others.
+#
+# Offline benchmark:
+#   python -m common.embedding_pipeline --chunks 2000 --batch-size 50 --in-flight 8 --latency 0.2
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+
+
+def is_rate_limit_error(exc):
+    if type(exc).__name__ in RATE_LIMIT_ERRORS:
+        return True
+    message = str(exc).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text; only used for throughput metrics
+    return max(1, len(text) // 4)
+
+
+class EmbeddingPipeline(Embeddings):
+    def __init__(self, embeddings, batch_size=100, max_in_flight=4, max_retries=6, base_delay=1.0, max_delay=60.0):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {"chunks": 0, "tokens": 0, "batches": 0, "retries": 0, "seconds": 0.0,
+                        "chunks_per_sec": 0.0, "tokens_per_sec": 0.0}
+        self._resume_at = 0.0
+
+    async def _embed_batch(self, batch, semaphore, executor):
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                # shared cooldown set by whichever batch hit the quota last
+                wait = self._resume_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    return await loop.run_in_executor(executor, self.embeddings.embed_documents, batch)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limit_error(e):
+                        raise
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (1 + random.random() * 0.25)
+                    self._resume_at = max(self._resume_at, loop.time() + delay)
+                    self.metrics["retries"] += 1
+
+    async def aembed_documents(self, texts):
+        texts = list(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            results = await asyncio.gather(*(self._embed_batch(b, semaphore, executor) for b in batches))
+        self._record(texts, len(batches), time.perf_counter() - start)
+        return [vector for batch in results for vector in batch]
+
+    def embed_documents(self, texts):
+        # private loop so the caller's thread event loop (used by gRPC) is left alone
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.aembed_documents(texts))
+        finally:
+            loop.close()
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def _record(self, texts, n_batches, seconds):
+        m = self.metrics
+        m["chunks"] += len(texts)
+        m["tokens"] += sum(estimate_tokens(t) for t in texts)
+        m["batches"] += n_batches
+        m["seconds"] += seconds
+        if m["seconds"] > 0:
+            m["chunks_per_sec"] = m["chunks"] / m["seconds"]
+            m["tokens_per_sec"] = m["tokens"] / m["seconds"]
+
+
+class LocalHashEmbeddings(Embeddings):
+    # Offline stand-in: deterministic hashed bag-of-words vectors, with optional
+    # simulated per-call latency and quota errors for benchmarking the pipeline.
+
+    def __init__(self, dim=768, latency=0.0, quota_error_rate=0.0, seed=0):
+        self.dim = dim
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self._random = random.Random(seed)
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.md5(token.encode()).digest()[:4], "little")
+            vector[h % self.dim] += 1.0 if h & (1 << 31) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        if self._random.random() < self.quota_error_rate:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding pipeline with the offline stand-in embedder")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-words", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per API call")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    words = ["convolution", "kernel", "stride", "pooling", "feature", "map", "layer", "network", "image", "filter"]
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(words) for _ in range(args.chunk_words)) for _ in range(args.chunks)]
+
+    embedder = LocalHashEmbeddings(latency=args.latency, quota_error_rate=args.quota_error_rate)
+    pipeline = EmbeddingPipeline(embedder, batch_size=args.batch_size, max_in_flight=args.in_flight, base_delay=0.05)
+    pipeline.embed_documents(texts)
+    print(json.dumps(pipeline.metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
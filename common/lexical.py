@@ -0,0 +1,102 @@
+# Tokenizer and Okapi BM25 scoring shared by the ATS pre-scorer and the
+# hybrid retriever.
+import re
+import math
+import heapq
+from collections import Counter
+
+# keeps tech terms such as c++, c#, node.js and ci/cd together
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does doing
+during each etc for from had has have having he her here hers him his how i if in into is it its itself
+just may me more most must my no nor not of off on once only or other our ours out over own per same she
+should so some such than that the their them then there these they this those through to too under until
+up us very was we were what when where which while who whom why will with within without would you your
+""".split())
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def content_tokens(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS and not t.isdigit()]
+
+
+class BM25:
+    # Okapi BM25 over a fixed list of token lists, backed by an inverted index
+    # so a query only touches the postings of its own terms
+
+    def __init__(self, docs=(), k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.lengths = []
+        self.postings = {}
+        self.add(docs)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, docs):
+        # new documents get the next positions
+        for doc in docs:
+            i = len(self.lengths)
+            self.lengths.append(len(doc))
+            for term, f in Counter(doc).items():
+                self.postings.setdefault(term, []).append((i, f))
+        self._prepare()
+
+    def remove(self, positions):
+        # drop documents and renumber the remaining ones
+        positions = set(positions)
+        new_pos, n = {}, 0
+        for i in range(len(self.lengths)):
+            if i not in positions:
+                new_pos[i] = n
+                n += 1
+        self.lengths = [length for i, length in enumerate(self.lengths) if i not in positions]
+        postings = {}
+        for term, plist in self.postings.items():
+            kept = [(new_pos[i], f) for i, f in plist if i in new_pos]
+            if kept:
+                postings[term] = kept
+        self.postings = postings
+        self._prepare()
+
+    def _prepare(self):
+        n = len(self.lengths)
+        avgdl = sum(self.lengths) / n if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+        self.norms = [self.k1 * (1 - self.b + self.b * length / avgdl) if avgdl else self.k1 for length in self.lengths]
+
+    def scores(self, query_tokens):
+        totals = [0.0] * len(self.lengths)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, f in self.postings[term]:
+                totals[i] += idf * f * (self.k1 + 1) / (f + self.norms[i])
+        return totals
+
+    def score(self, query_tokens, index):
+        return self.scores(query_tokens)[index]
+
+    def top_k(self, query_tokens, k):
+        # (position, score) of the k best matching documents
+        scores = self.scores(query_tokens)
+        best = heapq.nlargest(k, (i for i, s in enumerate(scores) if s > 0), key=scores.__getitem__)
+        return [(i, scores[i]) for i in best]
+
+    def to_dict(self):
+        return {"k1": self.k1, "b": self.b, "lengths": self.lengths, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data):
+        bm25 = cls(k1=data["k1"], b=data["b"])
+        bm25.lengths = data["lengths"]
+        bm25.postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        bm25._prepare()
+        return bm25
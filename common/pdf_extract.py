@@ -0,0 +1,111 @@
+# Parallel, page-streaming PDF text extraction shared by the PDF apps.
+#
+# Pages are extracted in a process pool and yielded one PageRecord at a time,
+# in file and page order, so callers never need to hold a whole document as a
+# single string. Only a bounded number of page batches is in flight at once.
+# With errors="record", a file or page batch that cannot be read becomes a
+# PageRecord with an error message instead of aborting the whole run.
+import io
+import os
+import itertools
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    from PyPDF2 import PdfReader
+
+PAGES_PER_TASK = 16
+
+# page numbers are 1-based, as shown in a PDF viewer; doc is the position of
+# the file in the sources passed to iter_pdf_pages; error is set (and text
+# empty) only for unreadable input with errors="record"
+PageRecord = namedtuple("PageRecord", ["source", "page", "text", "doc", "error"], defaults=[None])
+ERROR_MODES = ("raise", "record")
+
+
+def _source_name(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    return getattr(source, "name", "upload.pdf")
+
+
+def _payload(source):
+    # paths are reopened by the worker; uploads are shipped as bytes
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def _reader(payload):
+    return PdfReader(payload if isinstance(payload, str) else io.BytesIO(payload))
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def _extract_pages(payload, name, doc, start, stop, error=None):
+    if error is not None:
+        return [PageRecord(name, start + 1, "", doc, error)]
+    reader = _reader(payload)
+    return [PageRecord(name, i + 1, reader.pages[i].extract_text() or "", doc) for i in range(start, stop)]
+
+
+def _extract_pages_recording(payload, name, doc, start, stop, error=None):
+    try:
+        return _extract_pages(payload, name, doc, start, stop, error)
+    except Exception as e:
+        return [PageRecord(name, start + 1, "", doc, _describe(e))]
+
+
+def _iter_tasks(sources, pages_per_task, errors="raise"):
+    for doc, source in enumerate(sources):
+        name = _source_name(source)
+        try:
+            payload = _payload(source)
+            n_pages = len(_reader(payload).pages)
+        except Exception as e:
+            if errors == "raise":
+                raise
+            yield None, name, doc, 0, 0, _describe(e)
+            continue
+        for start in range(0, n_pages, pages_per_task):
+            yield payload, name, doc, start, min(start + pages_per_task, n_pages)
+
+
+def iter_pdf_pages(sources, max_workers=None, pages_per_task=PAGES_PER_TASK, errors="raise"):
+    # sources may mix file paths and file-like objects (e.g. Streamlit uploads).
+    # Input that fits in a single task, or max_workers=1, is extracted
+    # in-process without starting a pool.
+    if errors not in ERROR_MODES:
+        raise ValueError(f"errors must be one of {ERROR_MODES}, got {errors!r}")
+    extract = _extract_pages if errors == "raise" else _extract_pages_recording
+    tasks = _iter_tasks(sources, pages_per_task, errors)
+    head = list(itertools.islice(tasks, 2))
+    if max_workers == 1 or len(head) < 2:
+        for task in itertools.chain(head, tasks):
+            yield from extract(*task)
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for task in itertools.chain(head, tasks):
+            pending.append(pool.submit(extract, *task))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def pdf_text(sources, sep="\n", **kwargs):
+    # convenience for callers that need the full text (e.g. a single prompt)
+    return sep.join(record.text for record in iter_pdf_pages(sources, **kwargs) if record.text)
@@ -0,0 +1,37 @@
+# Hybrid retrieval helpers: reciprocal rank fusion and an optional local
+# cross-encoder reranker.
+RRF_K = 60
+
+# Optional reranker (used only if sentence-transformers is installed)
+CrossEncoder = None
+try:
+    from sentence_transformers import CrossEncoder as _CrossEncoder
+    CrossEncoder = _CrossEncoder
+except Exception:
+    pass
+
+
+def reciprocal_rank_fusion(rankings, key, k=RRF_K):
+    # rankings: lists of items, best first; items with equal key(item) are merged
+    scores, items = {}, {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank + 1)
+            items.setdefault(item_key, item)
+    return [items[item_key] for item_key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def load_reranker(model_name):
+    if not model_name or CrossEncoder is None:
+        return None
+    return CrossEncoder(model_name)
+
+
+def rerank(reranker, query, docs, top_n):
+    # LangChain documents re-ordered by cross-encoder relevance to the query
+    if reranker is None or not docs:
+        return docs[:top_n]
+    scores = reranker.predict([(query, d.page_content) for d in docs])
+    order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+    return [docs[i] for i in order[:top_n]]
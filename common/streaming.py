@@ -0,0 +1,33 @@
+# Token streaming helper for the RAG apps.
+#
+# TimedStream wraps the chunk iterator returned by a LangChain runnable's
+# .stream() and yields plain text while recording time-to-first-token and
+# total generation time.
+import time
+
+
+class TimedStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.ttft = None
+        self.total = None
+        self.text = ""
+
+    def __iter__(self):
+        start = time.perf_counter()
+        for chunk in self.chunks:
+            # chat models stream message chunks, string chains stream str
+            text = getattr(chunk, "content", chunk)
+            if not text:
+                continue
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - start
+            self.text += text
+            yield text
+        self.total = time.perf_counter() - start
+
+    def summary(self):
+        if self.total is None:
+            return ""
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        return f"First token after {ttft} · generated in {self.total:.2f}s"